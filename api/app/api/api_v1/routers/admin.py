@@ -1,19 +1,24 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
-from io import BytesIO
 import secrets
 import hashlib
 import uuid
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Response
-from sqlalchemy import func, or_
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from openpyxl import Workbook
 
-from api.app.db.session import get_db
+from api.app.core import s3
+from api.app.core.config import get_settings
+from api.app.crud.responses import ResponseSort, answer_distribution, list_responses_page
+from api.app.crud.tests import decode_cursor, encode_cursor
+from api.app.db.session import SessionLocal, get_db
 from api.app.dependencies.auth import get_admin_user
-from api.app.models import AdminToken, AdminUser, Test, TestEvent, TestResponse, TestRunLog
+from api.app.models import AdminToken, AdminUser, ExportJob, Test, TestResponse
 from api.app.schemas.admin import (
     AdminLoginRequest,
     AdminLoginResponse,
@@ -25,10 +30,27 @@ from api.app.schemas.admin import (
     AdminTestListItem,
     AdminTestReport,
     AdminFunnelStep,
+    ExportJobRead,
 )
+from api.app.services.admin_auth import AdminPrincipal, hash_token
+from api.app.services.export_jobs import DONE, export_jobs
+from api.app.services.exports import (
+    MEDIA_TYPES,
+    ExportFormat,
+    ExportLayout,
+    iter_rows,
+    response_answers,
+    stream_csv,
+    stream_xlsx,
+)
+from api.app.services.funnel import funnel_counts
 
 router = APIRouter(prefix="/admin", tags=["admin"], redirect_slashes=False)
 
+AdminTestSort = Literal["recent", "created"]
+ADMIN_PAGE_SIZE = 100
+ADMIN_MAX_PAGE_SIZE = 500
+
 
 def _hash_password(password: str, salt: str) -> str:
     digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"), 100_000)
@@ -46,12 +68,12 @@ def _verify_password(raw: str, stored: str) -> bool:
 def _issue_token(db: Session, admin: AdminUser) -> str:
     token = secrets.token_urlsafe(32)
     expires_at = datetime.now(timezone.utc) + timedelta(days=7)
-    db.add(AdminToken(admin_id=admin.id, token=token, expires_at=expires_at))
+    db.add(AdminToken(admin_id=admin.id, token_hash=hash_token(token), expires_at=expires_at))
     db.commit()
     return token
 
 
-def _apply_admin_scope(query, admin: AdminUser):
+def _apply_admin_scope(query, admin: AdminPrincipal):
     if admin.scope == "owner":
         if admin.username == "admin":
             return query
@@ -70,19 +92,26 @@ def admin_login(payload: AdminLoginRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/tests", response_model=list[AdminTestListItem])
-def list_tests(admin: AdminUser = Depends(get_admin_user), db: Session = Depends(get_db)):
-    base = _apply_admin_scope(db.query(Test), admin)
-    tests = (
-        base.filter(
-            or_(
-                db.query(TestRunLog.id).filter(TestRunLog.test_id == Test.id).exists(),
-                db.query(TestEvent.id).filter(TestEvent.test_id == Test.id).exists(),
-                db.query(TestResponse.id).filter(TestResponse.test_id == Test.id).exists(),
-            )
-        )
-        .order_by(Test.created_at.desc())
-        .all()
-    )
+def list_tests(
+    response: Response,
+    sort: AdminTestSort = "recent",
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=ADMIN_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    admin: AdminPrincipal = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
+    key = Test.last_activity_at if sort == "recent" else Test.created_at
+    query = _apply_admin_scope(db.query(Test), admin).filter(Test.last_activity_at.is_not(None))
+    if cursor:
+        try:
+            value, test_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(tuple_(key, Test.id) < tuple_(value, test_id))
+    tests = query.order_by(key.desc(), Test.id.desc()).limit(limit + 1).all()
+    if len(tests) > limit:
+        tests = tests[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(tests[-1], key.key)
     return [
         AdminTestListItem(
             id=t.id,
@@ -97,87 +126,57 @@ def list_tests(admin: AdminUser = Depends(get_admin_user), db: Session = Depends
             lead_collect_email=t.lead_collect_email,
             lead_collect_site=t.lead_collect_site,
             lead_site_url=t.lead_site_url,
+            last_activity_at=t.last_activity_at.isoformat() if t.last_activity_at else None,
+            run_log_count=t.run_log_count,
+            event_count=t.event_count,
+            response_count=t.response_count,
         )
         for t in tests
     ]
 
 
 def _build_funnel(test_id, question_count: int, db: Session) -> AdminTestFunnel:
-    screen_opens = (
-        db.query(func.count(TestEvent.id))
-        .filter(TestEvent.test_id == test_id, TestEvent.event_type == "screen_open")
-        .scalar()
-        or 0
-    )
-    answers = (
-        db.query(TestEvent.question_index, func.count(TestEvent.id))
-        .filter(TestEvent.test_id == test_id, TestEvent.event_type == "answer")
-        .group_by(TestEvent.question_index)
-        .all()
-    )
-    answers_map = {row[0]: row[1] for row in answers if row[0] is not None}
+    counts = funnel_counts(db, test_id)
+
+    def total(event_type: str) -> int:
+        return sum(count for (kind, _), count in counts.items() if kind == event_type)
+
     answer_steps = [
-        AdminFunnelStep(question_index=i, count=int(answers_map.get(i, 0)))
+        AdminFunnelStep(question_index=i, count=counts.get(("answer", i), 0))
         for i in range(1, max(question_count, 1) + 1)
     ]
-    lead_form_submits = (
-        db.query(func.count(TestEvent.id))
-        .filter(TestEvent.test_id == test_id, TestEvent.event_type == "lead_form_submit")
-        .scalar()
-        or 0
-    )
-    site_clicks = (
-        db.query(func.count(TestEvent.id))
-        .filter(TestEvent.test_id == test_id, TestEvent.event_type == "site_click")
-        .scalar()
-        or 0
-    )
     return AdminTestFunnel(
-        screen_opens=int(screen_opens),
+        screen_opens=total("screen_open"),
         answers=answer_steps,
-        lead_form_submits=int(lead_form_submits),
-        site_clicks=int(site_clicks),
+        lead_form_submits=total("lead_form_submit"),
+        site_clicks=total("site_click"),
     )
 
 
-def _responses_for_test(test_id, db: Session) -> list[AdminResponseRow]:
-    rows = (
-        db.query(TestResponse)
-        .filter(TestResponse.test_id == test_id)
-        .order_by(TestResponse.created_at.desc())
-        .all()
+def _response_row(row: TestResponse) -> AdminResponseRow:
+    return AdminResponseRow(
+        id=row.id,
+        created_at=row.created_at.isoformat() if row.created_at else None,
+        user_id=row.user_id,
+        user_username=row.user_username,
+        result_title=row.result_title,
+        answers=response_answers(row.answers),
+        lead_name=row.lead_name,
+        lead_phone=row.lead_phone,
+        lead_email=row.lead_email,
+        lead_site=row.lead_site,
+        lead_form_submitted=row.lead_form_submitted,
+        lead_site_clicked=row.lead_site_clicked,
     )
-    out: list[AdminResponseRow] = []
-    for row in rows:
-        answers: dict[str, str] = {}
-        raw = row.answers or {}
-        if isinstance(raw, list):
-            for entry in raw:
-                if not isinstance(entry, dict):
-                    continue
-                qid = str(entry.get("question_id") or entry.get("order_num") or "")
-                answers[qid] = str(entry.get("answer_text") or "")
-        elif isinstance(raw, dict):
-            answers = {str(k): str(v) for k, v in raw.items()}
-        out.append(
-            AdminResponseRow(
-                user_id=row.user_id,
-                user_username=row.user_username,
-                result_title=row.result_title,
-                answers=answers,
-                lead_name=row.lead_name,
-                lead_phone=row.lead_phone,
-                lead_email=row.lead_email,
-                lead_site=row.lead_site,
-                lead_form_submitted=row.lead_form_submitted,
-                lead_site_clicked=row.lead_site_clicked,
-            )
-        )
-    return out
 
 
 @router.get("/tests/{test_id}/report", response_model=AdminTestReport)
-def get_test_report(test_id: uuid.UUID, admin: AdminUser = Depends(get_admin_user), db: Session = Depends(get_db)):
+def get_test_report(
+    test_id: uuid.UUID,
+    include: Literal["distribution"] | None = None,
+    admin: AdminPrincipal = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
     query = _apply_admin_scope(db.query(Test), admin)
     test = query.filter(Test.id == test_id).first()
     if not test:
@@ -214,7 +213,6 @@ def get_test_report(test_id: uuid.UUID, admin: AdminUser = Depends(get_admin_use
         for r in sorted(test.results, key=lambda r: r.order_num or 0)
     ]
     funnel = _build_funnel(test.id, len(questions), db)
-    responses = _responses_for_test(test.id, db)
     return AdminTestReport(
         test=AdminTestListItem(
             id=test.id,
@@ -233,62 +231,114 @@ def get_test_report(test_id: uuid.UUID, admin: AdminUser = Depends(get_admin_use
         questions=questions,
         results=results,
         funnel=funnel,
-        responses=responses,
+        response_count=test.response_count,
+        # O(responses): only on ?include=distribution
+        distribution=answer_distribution(db, test.id) if include == "distribution" else None,
     )
 
 
+@router.get("/tests/{test_id}/responses", response_model=list[AdminResponseRow])
+def list_test_responses(
+    test_id: uuid.UUID,
+    response: Response,
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=ADMIN_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    sort: ResponseSort = "newest",
+    result_title: str | None = None,
+    lead_form_submitted: bool | None = None,
+    lead_site_clicked: bool | None = None,
+    lead: str | None = None,
+    admin: AdminPrincipal = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
+    if not _apply_admin_scope(db.query(Test.id), admin).filter(Test.id == test_id).first():
+        raise HTTPException(status_code=404, detail="Test not found")
+    try:
+        rows, next_cursor = list_responses_page(
+            db,
+            test_id,
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
+            result_title=result_title,
+            lead_form_submitted=lead_form_submitted,
+            lead_site_clicked=lead_site_clicked,
+            lead=lead,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [_response_row(row) for row in rows]
+
+
 @router.get("/tests/{test_id}/export")
-def export_test_report(test_id: uuid.UUID, admin: AdminUser = Depends(get_admin_user), db: Session = Depends(get_db)):
+def export_test_report(
+    test_id: uuid.UUID,
+    request: Request,
+    export_format: ExportFormat = Query("xlsx", alias="format"),
+    admin: AdminPrincipal = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
     query = _apply_admin_scope(db.query(Test), admin)
     test = query.filter(Test.id == test_id).first()
     if not test:
         raise HTTPException(status_code=404, detail="Test not found")
+    if export_format == "xlsx" and test.response_count > get_settings().export_sync_xlsx_max_rows:
+        # a workbook is complete only once the last row is written, so nothing
+        # could be streamed before the whole export ran; hand it to a job
+        job = export_jobs.enqueue(db, test, export_format, requested_by=admin.id)
+        return JSONResponse(
+            jsonable_encoder(_export_job_read(job)),
+            status_code=202,
+            headers={"Location": str(request.url_for("get_export_job", job_id=job.id))},
+        )
 
-    questions = sorted(test.questions, key=lambda q: q.order_num)
-    responses = _responses_for_test(test.id, db)
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Responses"
-
-    headers = ["telegram_id", "result_title"]
-    headers.extend([q.text for q in questions])
-    if test.lead_enabled:
-        if test.lead_collect_name:
-            headers.append("lead_name")
-        if test.lead_collect_phone:
-            headers.append("lead_phone")
-        if test.lead_collect_email:
-            headers.append("lead_email")
-        if test.lead_collect_site:
-            headers.append("lead_site")
-            headers.append("lead_site_clicked")
-    ws.append(headers)
-
-    for row in responses:
-        values = [row.user_id, row.result_title or ""]
-        for q in questions:
-            key = str(q.id)
-            values.append(row.answers.get(key) or "")
-        if test.lead_enabled:
-            if test.lead_collect_name:
-                values.append(row.lead_name or "")
-            if test.lead_collect_phone:
-                values.append(row.lead_phone or "")
-            if test.lead_collect_email:
-                values.append(row.lead_email or "")
-            if test.lead_collect_site:
-                values.append(row.lead_site or "")
-                values.append("yes" if row.lead_site_clicked else "no")
-        ws.append(values)
-
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    filename = f"test-{test.slug}-responses.xlsx"
+    layout = ExportLayout.for_test(test)
+    rows = iter_rows(SessionLocal, layout)
+    body = stream_csv(layout, rows) if export_format == "csv" else stream_xlsx(layout, rows)
+    filename = f"{layout.filename}.{export_format}"
     headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return Response(
-        content=buf.getvalue(),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers=headers,
-    )
+    return StreamingResponse(body, media_type=MEDIA_TYPES[export_format], headers=headers)
+
+
+def _export_job_read(job: ExportJob) -> ExportJobRead:
+    item = ExportJobRead.from_orm(job)
+    if job.status == DONE and job.s3_key:
+        item.download_url = s3.presigned_url(job.s3_key, expires_in=get_settings().export_url_ttl)
+    return item
+
+
+def _get_export_job(job_id: uuid.UUID, admin: AdminPrincipal, db: Session) -> ExportJob:
+    job = db.get(ExportJob, job_id)
+    if not job or not _apply_admin_scope(db.query(Test.id), admin).filter(Test.id == job.test_id).first():
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.post("/tests/{test_id}/exports", response_model=ExportJobRead, status_code=202)
+def create_export_job(
+    test_id: uuid.UUID,
+    export_format: ExportFormat = Query("xlsx", alias="format"),
+    admin: AdminPrincipal = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
+    query = _apply_admin_scope(db.query(Test), admin)
+    test = query.filter(Test.id == test_id).first()
+    if not test:
+        raise HTTPException(status_code=404, detail="Test not found")
+    job = export_jobs.enqueue(db, test, export_format, requested_by=admin.id)
+    return _export_job_read(job)
+
+
+@router.get("/exports/{job_id}", response_model=ExportJobRead)
+def get_export_job(job_id: uuid.UUID, admin: AdminPrincipal = Depends(get_admin_user), db: Session = Depends(get_db)):
+    return _export_job_read(_get_export_job(job_id, admin, db))
+
+
+@router.get("/exports/{job_id}/download")
+def download_export(job_id: uuid.UUID, admin: AdminPrincipal = Depends(get_admin_user), db: Session = Depends(get_db)):
+    job = _get_export_job(job_id, admin, db)
+    if job.status != DONE or not job.s3_key:
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}")
+    return RedirectResponse(s3.presigned_url(job.s3_key, expires_in=get_settings().export_url_ttl))
@@ -1,30 +1,84 @@
-
-
 from __future__ import annotations
+import asyncio
 import os
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from api.app.utils.image_processing import compress_image
-from api.app.services.storage import upload_bytes
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from api.app.core.telegram import TelegramInitData
+from api.app.db.session import get_db
+from api.app.models import MediaObject
+from api.app.utils.image_processing import MAX_W, PROCESSING_PARAMS, compress_variants
+from api.app.dependencies.auth import get_init_data
+from api.app.services.image_pool import ImagePoolBusy, ImagePoolUnavailable, image_pool
+from api.app.services.media_objects import content_hash, find_media, remember_media
+from api.app.services.storage import make_key, upload_bytes, variant_key
 
 router = APIRouter(prefix="/cards", tags=["cards"])
 
 MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "25"))
 PUBLIC_BASE = os.getenv("S3_PUBLIC_BASE_URL", "http://minio:9000/test-media")
 
+def _card_response(obj: MediaObject) -> dict:
+    return {
+        "key": obj.key,
+        "url": obj.url,
+        "content_type": obj.content_type,
+        "size": obj.size_bytes,
+        "width": obj.width,
+        "height": obj.height,
+        "color": obj.color,
+        "placeholder": obj.placeholder,
+        # ordered by width: pick the first with width >= CSS width * devicePixelRatio
+        "variants": obj.variants,
+    }
+
+
 @router.post("/upload-image")
-async def upload_card_image(file: UploadFile = File(...)):
+async def upload_card_image(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    init_data: TelegramInitData = Depends(get_init_data),
+):
     raw = await file.read()
     if len(raw) > MAX_UPLOAD_MB * 1024 * 1024:
         raise HTTPException(status_code=413, detail="File too large")
+    # keyed by the uploaded bytes, so a repeat upload skips both the pool and S3
+    digest = await run_in_threadpool(content_hash, raw)
+    known = await run_in_threadpool(find_media, db, digest, PROCESSING_PARAMS)
+    if known is not None:
+        return _card_response(known)
     try:
-        optimized, content_type = compress_image(raw)
+        variants, meta = await image_pool.run(compress_variants, raw)
+    except ImagePoolBusy:
+        raise HTTPException(status_code=503, detail="Image processing is busy, retry later", headers={"Retry-After": "1"})
+    except (asyncio.TimeoutError, BrokenProcessPool, ImagePoolUnavailable):
+        raise HTTPException(status_code=503, detail="Image processing failed, retry later")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Bad image: {e}")
 
-    key = upload_bytes(optimized, content_type)
-    return {
-        "key": key,
-        "url": f"{PUBLIC_BASE}/{key}",
-        "content_type": content_type,
-        "size": len(optimized),
-    }
\ No newline at end of file
+    # the MAX_W image keeps the plain key; the other widths are stored next to it
+    base = next(v for v in variants if v.width == MAX_W)
+    key = make_key(base.data, base.content_type)
+    keys = [key if v is base else variant_key(key, v.width) for v in variants]
+    await asyncio.gather(
+        *(run_in_threadpool(upload_bytes, v.data, v.content_type, key=k) for v, k in zip(variants, keys))
+    )
+    obj = MediaObject(
+        content_hash=digest,
+        params=PROCESSING_PARAMS,
+        key=key,
+        url=f"{PUBLIC_BASE}/{key}",
+        content_type=base.content_type,
+        size_bytes=len(base.data),
+        width=meta.width,
+        height=meta.height,
+        color=meta.color,
+        placeholder=meta.placeholder,
+        variants=[
+            {"url": f"{PUBLIC_BASE}/{k}", "key": k, "width": v.width, "height": v.height, "bytes": len(v.data)}
+            for v, k in zip(variants, keys)
+        ],
+    )
+    await run_in_threadpool(remember_media, db, obj)
+    return _card_response(obj)
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
 import io
-import uuid
 import re
 import os
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status, Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
 
 from api.app.core.s3 import put_bytes
+from api.app.db.session import get_db
+from api.app.models import MediaObject
+from api.app.services.image_pool import image_pool
+from api.app.services.media_objects import content_hash, find_media, remember_media
+from api.app.utils.image_processing import describe_image
 # Try to import real auth dependency; fall back to a no-op to avoid ImportError during boot
 try:
     from api.app.dependencies.auth import get_current_user  # type: ignore
@@ -17,27 +23,33 @@ except Exception:
 
 router = APIRouter(prefix="/media", tags=["media"])
 
-_SAFE_RE = re.compile(r"[^a-zA-Z0-9_.-]+")
+_EXT_RE = re.compile(r"\.[a-z0-9]{1,8}$")
 MAX_UPLOAD_MB = int(os.getenv("MEDIA_MAX_UPLOAD_MB", "25"))
 
 
-def _safe_key(filename: str, prefix: str | None = None) -> str:
-    base = filename or "file"
-    base = base.strip().replace(" ", "_")
-    base = _SAFE_RE.sub("-", base)
-    rid = uuid.uuid4().hex[:8]
-    key = f"{rid}-{base}"
+def _content_key(digest: str, filename: str, prefix: str | None = None) -> str:
+    # content-addressed: the same bytes always land on the same object
+    ext = _EXT_RE.search((filename or "").strip().lower())
+    key = f"{digest}{ext.group(0) if ext else ''}"
     if prefix:
         prefix = prefix.strip("/")
         key = f"{prefix}/{key}"
     return key
 
 
+def _media_response(obj: MediaObject) -> dict:
+    out = {"url": obj.url, "key": obj.key}
+    if obj.width is not None:
+        out.update(width=obj.width, height=obj.height, color=obj.color, placeholder=obj.placeholder)
+    return out
+
+
 @router.post("/upload")
 async def upload_image(
     file: UploadFile = File(...),
     prefix: str | None = Form(None),
     user: object | None = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ):
     try:
         content = await file.read()
@@ -53,9 +65,18 @@ async def upload_image(
             detail=f"File is too large (max {MAX_UPLOAD_MB} MB)",
         )
 
-    key = _safe_key(file.filename or "image", prefix or "uploads")
+    # raw uploads are stored as-is under a key derived from the bytes, so the
+    # bytes alone identify the object; the first upload's Content-Type wins
+    digest = await run_in_threadpool(content_hash, content)
+    params = "raw"
+    known = await run_in_threadpool(find_media, db, digest, params)
+    if known is not None:
+        return _media_response(known)
+
+    key = _content_key(digest, file.filename or "image", prefix or "uploads")
     try:
-        url = put_bytes(content, key=key, content_type=file.content_type)
+        # boto3 is blocking; keep it off the event loop
+        url = await run_in_threadpool(put_bytes, content, key=key, content_type=file.content_type)
     except Exception as exc:
         # Bubble up more context to help debug in logs/client
         raise HTTPException(
@@ -63,4 +84,29 @@ async def upload_image(
             detail=f"failed to upload s3: {type(exc).__name__}: {exc}"
         ) from exc
 
-    return {"url": url, "key": key}
+    meta = None
+    is_image = (file.content_type or "").startswith("image/")
+    if is_image:
+        # best effort: the upload itself succeeded, so a busy pool or an
+        # unreadable image only leaves the metadata out
+        try:
+            meta = await image_pool.run(describe_image, content)
+        except Exception:
+            meta = None
+    obj = MediaObject(
+        content_hash=digest,
+        params=params,
+        key=key,
+        url=url,
+        content_type=file.content_type,
+        size_bytes=len(content),
+        width=meta.width if meta else None,
+        height=meta.height if meta else None,
+        color=meta.color if meta else None,
+        placeholder=meta.placeholder if meta else None,
+    )
+    if meta is not None or not is_image:
+        # an image without metadata is not remembered, so the next upload of
+        # the same bytes gets another chance at describing it
+        await run_in_threadpool(remember_media, db, obj)
+    return _media_response(obj)
@@ -1,108 +1,103 @@
-from datetime import date, datetime, time, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from api.app.db.session import get_db
-from api.app.models import Test, TestRunLog
-from api.app.schemas.stats import StatsResponse
+from api.app.models import StatsDaily
+from api.app.schemas.stats import LogBufferStats, StatsResponse, StatsSeries
+from api.app.services.run_log_buffer import run_log_buffer
+from api.app.services.stats_rollup import (
+    COMPLETED,
+    CREATED,
+    OPENED,
+    SKETCH_ERROR,
+    hourly_series,
+    refresh_rollups,
+    rollup_series,
+    unique_users,
+)
 
 router = APIRouter(prefix="/stats", tags=["stats"], redirect_slashes=False)
 
-
-def _range_for_day(day_value: date) -> tuple[datetime, datetime]:
-    start = datetime.combine(day_value, time.min, tzinfo=timezone.utc)
-    end = start + timedelta(days=1)
-    return start, end
+SeriesBucket = Literal["hour", "day", "week"]
+# hourly buckets are computed from raw logs, so their range is kept short
+MAX_SERIES_DAYS = {"hour": 31, "day": 731, "week": 731}
 
 
-def _range_for_month(year: int, month: int) -> tuple[datetime, datetime]:
+def _month_days(year: int, month: int) -> tuple[date, date]:
     if month < 1 or month > 12:
         raise HTTPException(status_code=400, detail="month must be between 1 and 12")
-    start = datetime(year, month, 1, tzinfo=timezone.utc)
-    if month == 12:
-        end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
-    else:
-        end = datetime(year, month + 1, 1, tzinfo=timezone.utc)
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
     return start, end
 
 
 @router.get("", response_model=StatsResponse)
 @router.get("/", response_model=StatsResponse)
-def get_stats(day: date | None = None, month: int | None = None, year: int | None = None, db: Session = Depends(get_db)):
-    tests_created = db.query(func.count(Test.id)).scalar() or 0
-    tests_completed = (
-        db.query(func.count(TestRunLog.id))
-        .filter(TestRunLog.event_type == "complete")
-        .scalar()
-        or 0
-    )
-    opened_only = (
-        db.query(func.count(TestRunLog.id))
-        .filter(TestRunLog.event_type == "open")
-        .scalar()
-        or 0
-    )
-    tests_opened = max(opened_only, tests_completed)
-
+def get_stats(
+    day: date | None = None,
+    month: int | None = None,
+    year: int | None = None,
+    exact: bool = False,
+    db: Session = Depends(get_db),
+):
     today = datetime.now(timezone.utc).date()
     day_value = day or today
-    day_start, day_end = _range_for_day(day_value)
-
-    month_value = month or today.month
-    year_value = year or today.year
-    month_start, month_end = _range_for_month(year_value, month_value)
-
-    daily_created_users = (
-        db.query(func.count(func.distinct(Test.created_by)))
-        .filter(Test.created_at >= day_start, Test.created_at < day_end)
-        .scalar()
-        or 0
-    )
-    daily_opened_users = (
-        db.query(func.count(func.distinct(TestRunLog.user_id)))
-        .filter(TestRunLog.event_type.in_(["open", "complete"]))
-        .filter(TestRunLog.created_at >= day_start, TestRunLog.created_at < day_end)
-        .scalar()
-        or 0
-    )
-    daily_completed_users = (
-        db.query(func.count(func.distinct(TestRunLog.user_id)))
-        .filter(TestRunLog.event_type == "complete")
-        .filter(TestRunLog.created_at >= day_start, TestRunLog.created_at < day_end)
-        .scalar()
-        or 0
-    )
+    month_start, month_end = _month_days(year or today.year, month or today.month)
 
-    monthly_created_users = (
-        db.query(func.count(func.distinct(Test.created_by)))
-        .filter(Test.created_at >= month_start, Test.created_at < month_end)
-        .scalar()
-        or 0
-    )
-    monthly_opened_users = (
-        db.query(func.count(func.distinct(TestRunLog.user_id)))
-        .filter(TestRunLog.event_type.in_(["open", "complete"]))
-        .filter(TestRunLog.created_at >= month_start, TestRunLog.created_at < month_end)
-        .scalar()
-        or 0
-    )
-    monthly_completed_users = (
-        db.query(func.count(func.distinct(TestRunLog.user_id)))
-        .filter(TestRunLog.event_type == "complete")
-        .filter(TestRunLog.created_at >= month_start, TestRunLog.created_at < month_end)
-        .scalar()
-        or 0
-    )
+    refresh_rollups(db)
+    tests_created, opened_only, tests_completed = db.execute(
+        select(
+            func.coalesce(func.sum(StatsDaily.tests_created), 0),
+            func.coalesce(func.sum(StatsDaily.tests_opened), 0),
+            func.coalesce(func.sum(StatsDaily.tests_completed), 0),
+        )
+    ).one()
+    daily = unique_users(db, day_value, day_value + timedelta(days=1), exact=exact)
+    monthly = unique_users(db, month_start, month_end, exact=exact)
     return StatsResponse(
         tests_created=tests_created,
         tests_completed=tests_completed,
-        tests_opened=tests_opened,
-        daily_created_users=daily_created_users,
-        daily_opened_users=daily_opened_users,
-        daily_completed_users=daily_completed_users,
-        monthly_created_users=monthly_created_users,
-        monthly_opened_users=monthly_opened_users,
-        monthly_completed_users=monthly_completed_users,
+        tests_opened=max(opened_only, tests_completed),
+        daily_created_users=daily.get(CREATED, 0),
+        daily_opened_users=daily.get(OPENED, 0),
+        daily_completed_users=daily.get(COMPLETED, 0),
+        monthly_created_users=monthly.get(CREATED, 0),
+        monthly_opened_users=monthly.get(OPENED, 0),
+        monthly_completed_users=monthly.get(COMPLETED, 0),
+        approximate=not exact,
+        uniques_error=None if exact else SKETCH_ERROR,
     )
+
+
+@router.get("/series", response_model=StatsSeries)
+def get_stats_series(
+    first: date = Query(..., alias="from"),
+    last: date = Query(..., alias="to"),
+    bucket: SeriesBucket = "day",
+    db: Session = Depends(get_db),
+):
+    if last < first:
+        raise HTTPException(status_code=400, detail="to must not be before from")
+    if (last - first).days + 1 > MAX_SERIES_DAYS[bucket]:
+        raise HTTPException(
+            status_code=400, detail=f"range too long for {bucket} buckets (max {MAX_SERIES_DAYS[bucket]} days)"
+        )
+
+    if bucket == "hour":
+        return StatsSeries(bucket=bucket, approximate=False, items=hourly_series(db, first, last))
+    refresh_rollups(db)
+    return StatsSeries(
+        bucket=bucket,
+        approximate=True,
+        uniques_error=SKETCH_ERROR,
+        items=rollup_series(db, first, last, week=bucket == "week"),
+    )
+
+
+@router.get("/log-buffer", response_model=LogBufferStats)
+def get_log_buffer_stats():
+    return LogBufferStats(**run_log_buffer.metrics())
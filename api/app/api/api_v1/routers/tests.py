@@ -2,24 +2,41 @@ from __future__ import annotations
 
 import uuid
 import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import Request
 from fastapi import Response
 
 import re
-from typing import Optional
+from typing import Iterator, Literal, Optional
 
 from api.app.core.config import get_settings
+from api.app.core.logs import lazy
 from api.app.core.telegram import TelegramInitData, parse_init_data
-from api.app.crud.tests import create_test, delete_test, get_test_by_id, get_test_by_slug, list_tests, update_test
+from api.app.crud.tests import (
+    create_test_with_unique_slug,
+    delete_test,
+    get_test_by_id,
+    get_test_by_slug,
+    list_tests_page,
+    update_test,
+)
 from api.app.db.session import get_db
 from api.app.dependencies.auth import get_current_admin, get_init_data
-from api.app.schemas import SlugResponse, TestCreate, TestLogCreate, TestRead, TestUpdate
-from api.app.schemas.responses import LeadUpdate, TestEventCreate, TestResponseCreate
+from api.app.schemas import SlugResponse, TestCreate, TestLogCreate, TestRead, TestSummary, TestUpdate
+from api.app.schemas.responses import LeadUpdate, TestEventBatch, TestEventCreate, TestResponseCreate
 from api.app.models.test_models import Test as TestModel
 from api.app.models.test_models import TestEvent, TestResponse, TestRunLog
+from api.app.services.activity import record_activity, touch_activity
+from api.app.services.funnel import record_events
+from api.app.services.public_tests import etag_matches, public_test_cache
+from api.app.services.run_log_buffer import run_log_buffer
+from api.app.services.test_resolver import TestMeta, test_resolver
 
 logger = logging.getLogger("tests")
 
@@ -27,6 +44,10 @@ router = APIRouter(prefix="/tests", tags=["tests"], redirect_slashes=False,)
 
 _SLUG_RE = re.compile(r"[^a-z0-9-]+")
 _SRC_RE = re.compile(r"__src_(-?\d+)")
+_EVENT_TYPES = {"screen_open", "answer", "lead_form_submit", "site_click"}
+# client clocks are trusted only within this window around server time
+_CLIENT_TS_PAST = timedelta(hours=24)
+_CLIENT_TS_FUTURE = timedelta(minutes=5)
 
 def _slugify(text: Optional[str]) -> str:
     if not text:
@@ -37,24 +58,6 @@ def _slugify(text: Optional[str]) -> str:
     s = re.sub(r"-+", "-", s).strip("-")
     return s
 
-def _ensure_unique_slug(db: Session, base: str) -> str:
-    # if free — use as-is
-    if not get_test_by_slug(db, base):
-        return base
-    # try numeric suffixes -2, -3, ... -20
-    for i in range(2, 21):
-        candidate = f"{base}-{i}"
-        if not get_test_by_slug(db, candidate):
-            return candidate
-    # fallback to random short suffix
-    short = uuid.uuid4().hex[:6]
-    candidate = f"{base}-{short}"
-    if not get_test_by_slug(db, candidate):
-        return candidate
-    # extreme fallback
-    return f"{base}-{uuid.uuid4().hex[:8]}"
-
-
 def _is_admin(user_id: int | None) -> bool:
     if user_id is None:
         return False
@@ -78,6 +81,22 @@ def _build_share_link(slug: str) -> str:
     return f"run_{slug}"
 
 
+@contextmanager
+def _telemetry_write(db: Session, test: TestMeta) -> Iterator[None]:
+    """Write and commit rows for a test resolved from the cache.
+
+    The cached meta can outlive a delete made by another worker; the rows'
+    foreign key then fails, which answers 404 and drops the stale entry.
+    """
+    try:
+        yield
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        test_resolver.invalidate(slug=test.slug, test_id=test.id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test not found")
+
+
 def _maybe_init_data(request: Request) -> TelegramInitData | None:
     raw_init = request.headers.get("X-Telegram-Init-Data") or ""
     if not raw_init:
@@ -88,7 +107,7 @@ def _maybe_init_data(request: Request) -> TelegramInitData | None:
         return None
 
 
-def _validate_lead_fields(test: TestModel, payload: LeadUpdate) -> None:
+def _validate_lead_fields(test: TestMeta, payload: LeadUpdate) -> None:
     if not test.lead_enabled:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Lead collection disabled")
     if payload.lead_name is not None:
@@ -115,6 +134,49 @@ def _validate_lead_fields(test: TestModel, payload: LeadUpdate) -> None:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Lead site disabled")
 
 
+ListView = Literal["full", "summary"]
+TestListResponse = list[TestRead] | list[TestSummary]
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _list_page(db: Session, response: Response, *, limit: int, cursor: str | None, view: ListView, **filters) -> list[TestModel]:
+    try:
+        rows, next_cursor = list_tests_page(db, limit=limit, cursor=cursor, content=view == "full", **filters)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
+def _serialize_list(tests: list[TestModel], view: ListView) -> list[TestRead] | list[TestSummary]:
+    if view == "summary":
+        return [TestSummary.from_orm(t) for t in tests]
+    return [TestRead.from_orm(t) for t in tests]
+
+
+def _event_error(payload: TestEventCreate) -> str | None:
+    if payload.event_type not in _EVENT_TYPES:
+        return "Invalid event_type"
+    if payload.event_type == "answer" and payload.question_index is None:
+        return "Missing question_index"
+    return None
+
+
+def _event_time(payload: TestEventCreate, now: datetime) -> datetime:
+    ts = payload.client_ts
+    if ts is None:
+        return now
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    if now - _CLIENT_TS_PAST <= ts <= now + _CLIENT_TS_FUTURE:
+        return ts
+    return now
+
+
 def _extract_source(init_data: TelegramInitData) -> tuple[int, str | None]:
     chat = getattr(init_data, "chat", None)
     chat_type = getattr(chat, "type", None) or getattr(init_data, "chat_type", None)
@@ -135,49 +197,62 @@ def _extract_source(init_data: TelegramInitData) -> tuple[int, str | None]:
     return 0, chat_type
 
 
-@router.get("/", response_model=list[TestRead])
+@router.get("/", response_model=TestListResponse)
 def get_tests(
+    response: Response,
+    view: ListView = "full",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
     db: Session = Depends(get_db),
     _: TelegramInitData = Depends(get_current_admin),
 ):
-    return [TestRead.from_orm(t) for t in list_tests(db)]
+    return _serialize_list(_list_page(db, response, limit=limit, cursor=cursor, view=view), view)
 
 
 # Explicit non-slash path to avoid proxy/redirect quirks
-@router.get("/all", response_model=list[TestRead])
+@router.get("/all", response_model=TestListResponse)
 def get_tests_all(
+    response: Response,
+    view: ListView = "full",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
     db: Session = Depends(get_db),
     _: TelegramInitData = Depends(get_current_admin),
 ):
-    out = [TestRead.from_orm(t) for t in list_tests(db)]
-    logger.info("GET /tests/all -> %d items", len(out))
+    out = _serialize_list(_list_page(db, response, limit=limit, cursor=cursor, view=view), view)
+    logger.info("GET /tests/all", extra={"items": len(out)})
     return out
 
 
 # Endpoint to get only the tests created by the current user
-@router.get("/mine/", response_model=list[TestRead])
-@router.get("/mine", response_model=list[TestRead])
+@router.get("/mine/", response_model=TestListResponse)
+@router.get("/mine", response_model=TestListResponse)
 def get_my_tests(
-    request: Request,    
+    response: Response,
+    view: ListView = "full",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
     db: Session = Depends(get_db),
     init_data: TelegramInitData = Depends(get_init_data),
 ):
-    logger.info("GET /tests/mine by user=%s ua=%s", getattr(init_data.user, "id", None), request.headers.get("user-agent", "?"))
-    rows = (
-        db.query(TestModel)
-        .filter(getattr(TestModel, "created_by") == init_data.user.id)
-        .order_by(getattr(TestModel, "created_at").desc())
-        .all()
-    )
-    logger.info("/tests/mine user=%s -> %d items slugs=%s", getattr(init_data.user, "id", None), len(rows), [getattr(t, "slug", None) for t in rows])
-    return [TestRead.from_orm(t) for t in rows]
-
-@router.get("/public", response_model=list[TestRead])
-def get_public_tests(db: Session = Depends(get_db)):
+    rows = _list_page(db, response, limit=limit, cursor=cursor, view=view, created_by=init_data.user.id)
+    logger.info("GET /tests/mine", extra={"user_id": init_data.user.id, "items": len(rows)})
+    logger.debug("GET /tests/mine slugs=%s", lazy(lambda: [t.slug for t in rows]))
+    return _serialize_list(rows, view)
+
+@router.get("/public", response_model=TestListResponse)
+def get_public_tests(
+    response: Response,
+    view: ListView = "full",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+):
     # Открытый список: только опубликованные тесты
-    tests = [t for t in list_tests(db) if getattr(t, "is_public", False)]
-    out = [TestRead.from_orm(t) for t in tests]
-    logger.info("GET /tests/public -> %d items slugs=%s", len(out), [getattr(t, "slug", None) for t in tests])
+    tests = _list_page(db, response, limit=limit, cursor=cursor, view=view, public_only=True)
+    out = _serialize_list(tests, view)
+    logger.info("GET /tests/public", extra={"items": len(out)})
+    logger.debug("GET /tests/public slugs=%s", lazy(lambda: [t.slug for t in tests]))
     return out
 
 @router.post("", response_model=TestRead, status_code=status.HTTP_201_CREATED)
@@ -197,21 +272,15 @@ def create_test_handler(
         proposed = _slugify(proposed)
     if not proposed:
         proposed = f"test-{uuid.uuid4().hex[:6]}"
-    proposed = _ensure_unique_slug(db, proposed)
-    # mutate payload so downstream crud sees the final slug
-    try:
-        payload.slug = proposed  # type: ignore[attr-defined]
-    except Exception:
-        pass
-    test = create_test(
+    test = create_test_with_unique_slug(
         db,
         payload,
+        proposed,
         created_by=init_data.user.id,
         created_by_username=getattr(init_data.user, "username", None),
     )
     db.commit()
     db.refresh(test)
-    logger.info("POST /tests created id=%s slug=%s by=%s", getattr(test, "id", None), getattr(test, "slug", None), getattr(init_data.user, "id", None))
     # safety: если CRUD внезапно не записал created_by — досохраним
     if getattr(test, "created_by", None) is None:
         setattr(test, "created_by", init_data.user.id)
@@ -220,7 +289,7 @@ def create_test_handler(
         db.add(test)
         db.commit()
         db.refresh(test)
-    logger.info("/tests saved id=%s slug=%s created_by=%s", getattr(test, "id", None), getattr(test, "slug", None), getattr(test, "created_by", None))
+    logger.info("POST /tests created", extra={"test_id": test.id, "slug": test.slug, "user_id": test.created_by})
     out = TestRead.from_orm(test)
     # Отдаём модель как есть, а заголовок ставим через Response — FastAPI сам сериализует корректно
     response.status_code = status.HTTP_201_CREATED
@@ -254,8 +323,11 @@ def update_test_handler(
     _ensure_owner_or_admin(test, init_data)
     if payload.is_public is False:
         payload.is_public = True
+    previous_slug = test.slug
     updated = update_test(db, test, payload)
     db.commit()
+    public_test_cache.invalidate(previous_slug)
+    test_resolver.invalidate(slug=previous_slug, test_id=test_id)
     db.refresh(updated)
     return TestRead.from_orm(updated)
 
@@ -270,8 +342,11 @@ def delete_test_handler(
     if not test:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test not found")
     _ensure_owner_or_admin(test, init_data)
+    slug = test.slug
     delete_test(db, test)
     db.commit()
+    public_test_cache.invalidate(slug)
+    test_resolver.invalidate(slug=slug, test_id=test_id)
 
 
 @router.get("/slug/{slug}", response_model=TestRead)
@@ -284,15 +359,19 @@ def get_test_by_slug_handler(
     if not test:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test not found")
     _ensure_owner_or_admin(test, init_data)
-    logger.info("GET /tests/slug/%s -> found id=%s", slug, getattr(test, "id", None))
+    logger.info("GET /tests/slug", extra={"slug": slug, "test_id": test.id})
     return TestRead.from_orm(test)
 
 
 @router.get("/slug/{slug}/public", response_model=TestRead)
 def get_public_test(slug: str, request: Request, db: Session = Depends(get_db)):
-    test = get_test_by_slug(db, slug)
-    if not test or not test.is_public:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Public test not found")
+    cached = public_test_cache.get(slug)
+    if cached is None:
+        version = public_test_cache.version(slug)
+        test = get_test_by_slug(db, slug)
+        if not test or not test.is_public:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Public test not found")
+        cached = public_test_cache.store(slug, version, test)
     init_data = None
     raw_init = request.headers.get("X-Telegram-Init-Data") or ""
     if raw_init:
@@ -308,25 +387,22 @@ def get_public_test(slug: str, request: Request, db: Session = Depends(get_db)):
         source_id, source_type = 0, None
         user_id = 0
         user_username = None
-    try:
-        log_entry = TestRunLog(
-            test=test,
-            test_id=getattr(test, "id", None),
-            test_slug=slug,
-            link=_build_share_link(slug),
-            user_id=user_id,
-            user_username=user_username,
-            source_chat_id=source_id,
-            source_chat_type=source_type,
-            test_owner_username=getattr(test, "created_by_username", None),
-            event_type="open",
-        )
-        db.add(log_entry)
-        db.commit()
-    except Exception:
-        db.rollback()
-    logger.info("GET /tests/slug/%s/public -> found id=%s", slug, getattr(test, "id", None))
-    return TestRead.from_orm(test)
+    run_log_buffer.submit(
+        test_id=cached.test_id,
+        test_slug=slug,
+        link=_build_share_link(slug),
+        user_id=user_id,
+        user_username=user_username,
+        source_chat_id=source_id,
+        source_chat_type=source_type,
+        test_owner_username=cached.owner_username,
+        event_type="open",
+    )
+    logger.info("GET /tests/slug/public", extra={"slug": slug, "test_id": cached.test_id})
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("If-None-Match"), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 
 @router.post("/slug/{slug}/logs", status_code=status.HTTP_201_CREATED)
@@ -336,7 +412,7 @@ def log_test_completion(
     db: Session = Depends(get_db),
     init_data: TelegramInitData = Depends(get_init_data),
 ):
-    test = get_test_by_slug(db, slug)
+    test = test_resolver.by_slug(db, slug)
     if not test:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test not found")
     source_id, source_type = _extract_source(init_data)
@@ -345,25 +421,22 @@ def log_test_completion(
     if event_type not in {"open", "complete"}:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid event_type")
     log_entry = TestRunLog(
-        test=test,
-        test_id=getattr(test, "id", None),
+        test_id=test.id,
         test_slug=slug,
         link=link,
         user_id=init_data.user.id,
         user_username=getattr(init_data.user, "username", None),
         source_chat_id=source_id,
         source_chat_type=source_type,
-        test_owner_username=getattr(test, "created_by_username", None),
+        test_owner_username=test.created_by_username,
         event_type=event_type,
     )
-    db.add(log_entry)
-    db.commit()
+    with _telemetry_write(db, test):
+        db.add(log_entry)
+    record_activity("run_log", [test.id])
     logger.info(
-        "POST /tests/slug/%s/logs user=%s source=%s event=%s",
-        slug,
-        getattr(init_data.user, "id", None),
-        source_id,
-        event_type,
+        "POST /tests/slug/logs",
+        extra={"slug": slug, "user_id": init_data.user.id, "source_chat_id": source_id, "event": event_type},
     )
     return {"status": "ok"}
 
@@ -375,28 +448,67 @@ def log_test_event(
     request: Request,
     db: Session = Depends(get_db),
 ):
-    test = get_test_by_slug(db, slug)
+    test = test_resolver.by_slug(db, slug)
     if not test:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test not found")
     init_data = _maybe_init_data(request)
-    event_type = payload.event_type
-    if event_type not in {"screen_open", "answer", "lead_form_submit", "site_click"}:
-        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid event_type")
-    if event_type == "answer" and payload.question_index is None:
-        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Missing question_index")
+    error = _event_error(payload)
+    if error:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=error)
     entry = TestEvent(
-        test=test,
-        test_id=getattr(test, "id", None),
+        test_id=test.id,
         test_slug=slug,
         user_id=init_data.user.id if init_data else 0,
-        event_type=event_type,
+        event_type=payload.event_type,
         question_index=payload.question_index,
+        created_at=_event_time(payload, datetime.now(timezone.utc)),
     )
-    db.add(entry)
-    db.commit()
+    with _telemetry_write(db, test):
+        db.add(entry)
+    record_events(test.id, [(entry.event_type, entry.question_index)])
+    record_activity("event", [test.id])
     return {"status": "ok"}
 
 
+@router.post("/slug/{slug}/events/batch", status_code=status.HTTP_201_CREATED)
+def log_test_events_batch(
+    slug: str,
+    payload: TestEventBatch,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    errors = [
+        {"index": idx, "detail": error}
+        for idx, error in ((idx, _event_error(event)) for idx, event in enumerate(payload.events))
+        if error
+    ]
+    if errors:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=errors)
+    test = test_resolver.by_slug(db, slug)
+    if not test:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test not found")
+    init_data = _maybe_init_data(request)
+    user_id = init_data.user.id if init_data else 0
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "test_id": test.id,
+            "test_slug": slug,
+            "user_id": user_id,
+            "event_type": event.event_type,
+            "question_index": event.question_index,
+            "created_at": _event_time(event, now),
+        }
+        for event in payload.events
+    ]
+    with _telemetry_write(db, test):
+        db.execute(insert(TestEvent.__table__), rows)
+    record_events(test.id, [(row["event_type"], row["question_index"]) for row in rows])
+    record_activity("event", [test.id] * len(rows), at=now)
+    return {"status": "ok", "accepted": len(rows)}
+
+
 @router.post("/slug/{slug}/responses", status_code=status.HTTP_201_CREATED)
 def create_test_response(
     slug: str,
@@ -404,22 +516,22 @@ def create_test_response(
     request: Request,
     db: Session = Depends(get_db),
 ):
-    test = get_test_by_slug(db, slug)
+    test = test_resolver.by_slug(db, slug)
     if not test:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test not found")
     init_data = _maybe_init_data(request)
     answers = [a.model_dump() if hasattr(a, "model_dump") else a.dict() for a in payload.answers]
     response = TestResponse(
-        test=test,
-        test_id=getattr(test, "id", None),
+        test_id=test.id,
         test_slug=slug,
         user_id=init_data.user.id if init_data else 0,
         user_username=getattr(init_data.user, "username", None) if init_data else "unauthorized",
         result_title=payload.result_title,
         answers=answers,
     )
-    db.add(response)
-    db.commit()
+    with _telemetry_write(db, test):
+        db.add(response)
+    record_activity("response", [test.id])
     db.refresh(response)
     return {"response_id": str(response.id)}
 
@@ -439,7 +551,7 @@ def update_test_response(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
     if response.user_id and not init_data:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing Telegram init data")
-    test = get_test_by_id(db, response.test_id) if response.test_id else None
+    test = test_resolver.by_id(db, response.test_id) if response.test_id else None
     if test:
         _validate_lead_fields(test, payload)
     if payload.lead_name is not None:
@@ -456,6 +568,8 @@ def update_test_response(
         response.lead_site_clicked = payload.lead_site_clicked
     db.add(response)
     db.commit()
+    if response.test_id:
+        touch_activity(response.test_id)
     return {"status": "ok"}
 
 
@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import List
+from typing import Dict, List
 
 import json
 import os
@@ -20,6 +20,44 @@ class Settings(BaseSettings):
     admin_ids: List[int] = []
     bot_token: str = ""
     bot_username: str | None = None
+    public_test_cache_size: int = 1024
+    public_test_cache_ttl: int = 60
+    test_resolver_cache_size: int = 4096
+    test_resolver_ttl: int = 60
+    run_log_batch_size: int = 200
+    run_log_flush_interval: float = 1.0
+    run_log_queue_size: int = 10000
+    # activity counters on tests are aggregated in memory and written this often
+    activity_flush_interval: float = 2.0
+    stats_refresh_interval: int = 60
+    stats_catchup_days: int = 7
+    # maintain test_funnel_counters at ingestion and read admin funnels from it;
+    # after running with it off, rebuild with `python -m api.scripts.rebuild_funnel_counters`
+    funnel_counters_enabled: bool = True
+    # counter deltas are aggregated in memory and upserted this often
+    funnel_flush_interval: float = 2.0
+    # larger XLSX exports are queued as a job instead of built in the request
+    export_sync_xlsx_max_rows: int = 5000
+    export_workers: int = 2
+    export_job_timeout: int = 1800
+    export_url_ttl: int = 300
+    # export jobs and their S3 files are deleted after export_retention seconds
+    export_retention: int = 7 * 24 * 3600
+    export_sweep_interval: int = 3600
+    admin_token_cache_size: int = 1024
+    admin_token_cache_ttl: int = 60
+    admin_token_sweep_interval: int = 3600
+    init_data_cache_size: int = 10000
+    log_level: str = "INFO"
+    log_format: str = "json"  # json | text
+    log_queue_size: int = 10000
+    # fraction of INFO/DEBUG records kept per logger; warnings and errors are never sampled
+    log_sample_rates: Dict[str, float] = {"tests": 0.1, "auth": 0.1, "api.tg_auth": 0.1}
+    # card image compression runs in a process pool; uploads beyond
+    # workers + queue limit are refused with 503 instead of queueing
+    image_workers: int = 2
+    image_queue_limit: int = 8
+    image_job_timeout: float = 30.0
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Mapping
+
+from api.app.core.config import get_settings
+
+# attributes every LogRecord has; anything else on a record came from ``extra=``
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class lazy:
+    """Defers an expensive log argument until the record is actually formatted.
+
+        logger.info("saved %s", lazy(lambda: [t.slug for t in rows]))
+
+    Works both as a ``%s`` argument and as an ``extra=`` field value; a record
+    dropped by level or sampling never calls ``fn``.
+    """
+
+    __slots__ = ("fn",)
+
+    def __init__(self, fn: Callable[[], Any]):
+        self.fn = fn
+
+    def __str__(self) -> str:
+        return str(self.fn())
+
+    def __repr__(self) -> str:
+        return repr(self.fn())
+
+
+class SamplingFilter(logging.Filter):
+    """Passes a ``rate`` fraction of records below WARNING; warnings and errors always pass.
+
+    ``rates`` maps logger names to a rate in ``[0, 1]``; the most specific
+    dotted prefix wins, loggers without an entry are not sampled.
+    """
+
+    def __init__(self, rates: Mapping[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._resolved: dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+def _extra_fields(record: logging.LogRecord) -> dict[str, Any]:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS and not key.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ``ts``, ``level``, ``logger``, ``msg``, ``exc`` and any ``extra=`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        out.update(_extra_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        if record.stack_info:
+            out["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """``asctime level logger: msg`` followed by the ``extra=`` fields as ``key=value``."""
+
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        extra = _extra_fields(record)
+        if extra:
+            line += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        return line
+
+
+class _QueueHandler(QueueHandler):
+    """Hands records to the listener thread without ever blocking the caller.
+
+    The message, lazy fields and traceback are rendered here (the record's
+    arguments may not outlive the request), the formatting proper happens on
+    the listener thread. When the queue is full the record is dropped and
+    counted.
+    """
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = _TRACEBACKS.formatException(record.exc_info)
+        prepared = logging.makeLogRecord(vars(record))
+        prepared.msg = message
+        prepared.message = message
+        prepared.args = None
+        prepared.exc_info = None
+        prepared.exc_text = exc_text
+        for key, value in vars(prepared).items():
+            if isinstance(value, lazy):
+                setattr(prepared, key, str(value))
+        return prepared
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_TRACEBACKS = logging.Formatter()
+
+
+class LogPipeline:
+    """Root handler writing to stderr through a bounded queue and a listener thread.
+
+    ``configure`` installs the handler and the per-logger sampling filters
+    once per process; ``start``/``stop`` run the listener (``stop`` drains
+    the queue).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._handler: _QueueHandler | None = None
+        self._listener: QueueListener | None = None
+
+    def configure(self) -> None:
+        with self._lock:
+            if self._handler is not None:
+                return
+            settings = get_settings()
+            q: queue.Queue = queue.Queue(settings.log_queue_size)
+            self._handler = _QueueHandler(q)
+            output = logging.StreamHandler(sys.stderr)
+            if settings.log_format == "json":
+                output.setFormatter(JsonFormatter())
+            else:
+                output.setFormatter(TextFormatter())
+            self._listener = QueueListener(q, output, respect_handler_level=True)
+
+            root = logging.getLogger()
+            root.addHandler(self._handler)
+            root.setLevel(settings.log_level.upper())
+            # filters on the named loggers drop sampled-out records before any handler sees them
+            sampling = SamplingFilter(settings.log_sample_rates)
+            for name in settings.log_sample_rates:
+                logging.getLogger(name).addFilter(sampling)
+        self.start()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._listener is not None and self._listener._thread is None:
+                self._listener.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._listener is not None and self._listener._thread is not None:
+                self._listener.stop()
+
+    @property
+    def dropped(self) -> int:
+        return self._handler.dropped if self._handler is not None else 0
+
+
+log_pipeline = LogPipeline()
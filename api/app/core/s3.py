@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import uuid
 import os
+from datetime import datetime
 from typing import Optional
 
 import boto3
@@ -39,6 +40,49 @@ def put_bytes(data: bytes, *, key: Optional[str] = None, content_type: Optional[
     return public_url(key)
 
 
+def put_file(
+    path: str,
+    *,
+    key: str,
+    content_type: Optional[str] = None,
+    content_disposition: Optional[str] = None,
+) -> str:
+    """Upload a local file (multipart for large files, read from disk in parts); returns the key."""
+    s = get_settings()
+    c = _client()
+    bucket = s.s3_bucket
+    assert bucket
+    extra = {}
+    if content_type:
+        extra["ContentType"] = content_type
+    if content_disposition:
+        extra["ContentDisposition"] = content_disposition
+    c.upload_file(path, bucket, key, ExtraArgs=extra or None)
+    return key
+
+
+def delete_older_than(prefix: str, cutoff: datetime) -> int:
+    """Delete every object under ``prefix`` last modified before ``cutoff``; returns how many."""
+    s = get_settings()
+    c = _client()
+    removed = 0
+    for page in c.get_paginator("list_objects_v2").paginate(Bucket=s.s3_bucket, Prefix=prefix):
+        stale = [{"Key": obj["Key"]} for obj in page.get("Contents", ()) if obj["LastModified"] < cutoff]
+        if stale:
+            # a listing page holds at most 1000 keys, the delete_objects limit
+            c.delete_objects(Bucket=s.s3_bucket, Delete={"Objects": stale, "Quiet": True})
+            removed += len(stale)
+    return removed
+
+
+def presigned_url(key: str, *, expires_in: int = 300) -> str:
+    """Time-limited GET URL for a private object."""
+    s = get_settings()
+    return _client().generate_presigned_url(
+        "get_object", Params={"Bucket": s.s3_bucket, "Key": key}, ExpiresIn=expires_in
+    )
+
+
 def public_url(key: str) -> str:
     s = get_settings()
     if s.s3_public_base_url:
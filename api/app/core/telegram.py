@@ -5,17 +5,19 @@ import hmac
 import json
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from urllib.parse import parse_qsl
 import logging
+from functools import lru_cache
+from urllib.parse import parse_qsl
 
 from fastapi import HTTPException, status
 
+from api.app.core.cache import LRUCache
 from api.app.core.config import get_settings
+
 logger = logging.getLogger("api.tg_auth")
-logger.setLevel(logging.DEBUG)
 
 
-@dataclass
+@dataclass(frozen=True)
 class TelegramUser:
     id: int
     first_name: str | None = None
@@ -24,7 +26,7 @@ class TelegramUser:
     language_code: str | None = None
 
 
-@dataclass
+@dataclass(frozen=True)
 class TelegramChat:
     id: int | None = None
     type: str | None = None
@@ -32,7 +34,7 @@ class TelegramChat:
     username: str | None = None
 
 
-@dataclass
+@dataclass(frozen=True)
 class TelegramInitData:
     query_id: str | None
     user: TelegramUser
@@ -44,55 +46,68 @@ class TelegramInitData:
     raw: str
 
 
+INIT_DATA_MAX_AGE = timedelta(hours=24)
+
+# verified init data by sha256(secret key + raw string); a WebApp session
+# resends the same header on every request until auth_date + 24h
+_verified = LRUCache(get_settings().init_data_cache_size)
+
+
+@lru_cache(maxsize=4)
+def _secret_key(bot_token: str) -> bytes:
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
 def parse_init_data(init_data: str) -> TelegramInitData:
-    logger.info("parse_init_data: received init_data length=%s", len(init_data or ""))
     if not init_data:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing init data")
+    settings = get_settings()
+    if not settings.bot_token:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Bot token not configured")
+
+    secret_key = _secret_key(settings.bot_token)
+    cache_key = hashlib.sha256(secret_key + init_data.encode()).digest()
+    cached = _verified.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = _verify_init_data(init_data, secret_key)
+    ttl = (result.auth_date + INIT_DATA_MAX_AGE - datetime.now(timezone.utc)).total_seconds()
+    if ttl > 0:
+        _verified.set(cache_key, result, ttl=ttl)
+    return result
 
+
+def _verify_init_data(init_data: str, secret_key: bytes) -> TelegramInitData:
     data = dict(parse_qsl(init_data, keep_blank_values=True))
-    logger.info("parse_init_data: keys=%s", sorted(list(data.keys())))
     hash_value = data.pop("hash", None)
     if not hash_value:
         logger.warning("parse_init_data: missing hash")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing hash")
 
-    settings = get_settings()
-    logger.info("parse_init_data: bot_token_present=%s", bool(settings.bot_token))
-    if not settings.bot_token:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Bot token not configured")
-
-    secret_key = hmac.new(b"WebAppData", settings.bot_token.encode(), hashlib.sha256).digest()
     data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(data.items()))
-    logger.info("parse_init_data: data_check_string=%r", data_check_string)
     computed_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
-    logger.info(
-        "parse_init_data: received_hash_prefix=%s computed_hash_prefix=%s",
-        (hash_value or "")[:10],
-        computed_hash[:10],
-    )
     if not hmac.compare_digest(computed_hash, hash_value):
-        logger.warning("parse_init_data: signature mismatch")
+        logger.warning("parse_init_data: signature mismatch", extra={"init_data_len": len(init_data)})
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid init data signature")
 
     auth_date_raw = data.get("auth_date")
-    logger.info("parse_init_data: auth_date_raw=%s", auth_date_raw)
     if not auth_date_raw:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing auth_date")
 
     auth_dt = datetime.fromtimestamp(int(auth_date_raw), tz=timezone.utc)
-    if datetime.now(timezone.utc) - auth_dt > timedelta(hours=24):
-        logger.warning("parse_init_data: init data expired: auth_dt=%s now=%s", auth_dt.isoformat(), datetime.now(timezone.utc).isoformat())
+    if datetime.now(timezone.utc) - auth_dt > INIT_DATA_MAX_AGE:
+        logger.warning("parse_init_data: init data expired", extra={"auth_ts": int(auth_dt.timestamp())})
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Init data expired")
 
     user_raw = data.get("user")
-    logger.info("parse_init_data: has_user=%s", bool(user_raw))
     if not user_raw:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing user info")
 
     try:
         user_data = json.loads(user_raw)
     except json.JSONDecodeError as exc:
-        logger.warning("parse_init_data: malformed user json: %s", user_raw[:80] if user_raw else None)
+        logger.warning("parse_init_data: malformed user json")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed user data") from exc
 
     user = TelegramUser(
@@ -115,7 +130,7 @@ def parse_init_data(init_data: str) -> TelegramInitData:
                 username=chat_data.get("username"),
             )
         except Exception as exc:
-            logger.warning("parse_init_data: malformed chat json: %s err=%s", chat_raw[:80], exc)
+            logger.warning("parse_init_data: malformed chat json: %s", exc)
             chat_obj = None
     elif data.get("chat_type"):
         chat_obj = TelegramChat(id=None, type=data.get("chat_type"))
@@ -124,12 +139,9 @@ def parse_init_data(init_data: str) -> TelegramInitData:
     chat_type = data.get("chat_type") or getattr(chat_obj, "type", None)
     chat_instance = data.get("chat_instance")
 
-    logger.info(
-        "parse_init_data: ok user_id=%s auth_ts=%s chat_type=%s start_param=%s",
-        user.id,
-        int(auth_dt.timestamp()),
-        chat_type,
-        start_param,
+    logger.debug(
+        "parse_init_data: verified",
+        extra={"user_id": user.id, "auth_ts": int(auth_dt.timestamp()), "chat_type": chat_type, "start_param": start_param},
     )
     return TelegramInitData(
         query_id=data.get("query_id"),
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import uuid
+from typing import Literal
+
+from sqlalchemy import or_, text, tuple_
+from sqlalchemy.orm import Session
+
+from api.app.crud.tests import decode_cursor, encode_cursor
+from api.app.models import TestResponse
+
+ResponseSort = Literal["newest", "oldest"]
+
+# counts answers of both stored shapes: a list of {question_id|order_num, answer_text}
+# entries and the legacy {question key: answer text} object; a response that lists
+# the same answer twice counts once
+_DISTRIBUTION_SQL = text(
+    """
+    SELECT COALESCE(e.value->>'question_id', e.value->>'order_num') AS question_key,
+           e.value->>'answer_text' AS answer_text,
+           COUNT(DISTINCT r.id) AS n
+    FROM test_responses r
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(r.answers) = 'array' THEN r.answers ELSE '[]'::jsonb END
+    ) AS e(value)
+    WHERE r.test_id = :test_id AND jsonb_typeof(e.value) = 'object'
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT o.key, o.value, COUNT(DISTINCT r.id)
+    FROM test_responses r
+    CROSS JOIN LATERAL jsonb_each_text(
+        CASE WHEN jsonb_typeof(r.answers) = 'object' THEN r.answers ELSE '{}'::jsonb END
+    ) AS o
+    WHERE r.test_id = :test_id
+    GROUP BY 1, 2
+    """
+)
+
+
+def list_responses_page(
+    db: Session,
+    test_id: uuid.UUID,
+    *,
+    limit: int,
+    cursor: str | None = None,
+    sort: ResponseSort = "newest",
+    result_title: str | None = None,
+    lead_form_submitted: bool | None = None,
+    lead_site_clicked: bool | None = None,
+    lead: str | None = None,
+) -> tuple[list[TestResponse], str | None]:
+    """One page of a test's responses, keyset-paginated on (created_at, id).
+
+    ``lead`` is a case-insensitive substring match on the lead name, phone,
+    email and site. Raises ``ValueError`` on a malformed cursor.
+    """
+    query = db.query(TestResponse).filter(TestResponse.test_id == test_id)
+    if result_title is not None:
+        query = query.filter(TestResponse.result_title == result_title)
+    if lead_form_submitted is not None:
+        query = query.filter(TestResponse.lead_form_submitted.is_(lead_form_submitted))
+    if lead_site_clicked is not None:
+        query = query.filter(TestResponse.lead_site_clicked.is_(lead_site_clicked))
+    if lead:
+        pattern = "%" + lead.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = query.filter(
+            or_(
+                TestResponse.lead_name.ilike(pattern, escape="\\"),
+                TestResponse.lead_phone.ilike(pattern, escape="\\"),
+                TestResponse.lead_email.ilike(pattern, escape="\\"),
+                TestResponse.lead_site.ilike(pattern, escape="\\"),
+            )
+        )
+
+    key = tuple_(TestResponse.created_at, TestResponse.id)
+    if cursor:
+        created_at, response_id = decode_cursor(cursor)
+        boundary = tuple_(created_at, response_id)
+        query = query.filter(key < boundary if sort == "newest" else key > boundary)
+    if sort == "newest":
+        query = query.order_by(TestResponse.created_at.desc(), TestResponse.id.desc())
+    else:
+        query = query.order_by(TestResponse.created_at.asc(), TestResponse.id.asc())
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
+
+
+def answer_distribution(db: Session, test_id: uuid.UUID) -> dict[str, dict[str, int]]:
+    """``{question key: {answer text: responses}}`` aggregated in the database.
+
+    Reads every response of the test, so the report header only includes it on request.
+    """
+    distribution: dict[str, dict[str, int]] = {}
+    for question_key, answer_text, count in db.execute(_DISTRIBUTION_SQL, {"test_id": test_id}):
+        if not question_key or not answer_text:
+            continue
+        answers = distribution.setdefault(question_key, {})
+        answers[answer_text] = answers.get(answer_text, 0) + count
+    return distribution
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import base64
+import binascii
 import uuid
+from datetime import datetime
 
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session, selectinload
 
 from api.app.models import Answer, Question, Result, Test, TestType
 from api.app.schemas import TestCreate, TestUpdate
@@ -42,38 +47,111 @@ def create_test(db: Session, payload: TestCreate, *, created_by: int, created_by
         "lead_site_url",
     }
     test = Test(
+        id=uuid.uuid4(),
         **{k: v for k, v in data.items() if k in base_fields},
         created_by=created_by,
         created_by_username=created_by_username,
     )
     db.add(test)
+    db.flush()
 
+    # Ids are assigned here so answers can point at their question/result
+    # without a flush per row; each table is then written with one
+    # multi-row INSERT. Client-supplied ids only serve as references inside
+    # the payload and are never persisted.
+    result_ids: dict[uuid.UUID, uuid.UUID] = {}
+    result_rows = []
     for idx, result in enumerate(results_data):
-        payload = dict(result)
-        if not payload.get("order_num"):
-            payload["order_num"] = idx + 1
-        result_obj = Result(test=test, **payload)
-        db.add(result_obj)
-        db.flush()
+        row = dict(result)
+        row_id = uuid.uuid4()
+        client_id = row.pop("id", None)
+        if client_id:
+            result_ids[client_id] = row_id
+        if not row.get("order_num"):
+            row["order_num"] = idx + 1
+        result_rows.append({**row, "id": row_id, "test_id": test.id})
+
+    question_ids: dict[uuid.UUID, uuid.UUID] = {}
+    question_rows = []
+    answer_rows = []
+
+    def add_answer(answer: dict, question_id: uuid.UUID | None) -> None:
+        row = dict(answer)
+        row.pop("id", None)
+        result_id = row.get("result_id")
+        row["result_id"] = result_ids.get(result_id, result_id)
+        answer_rows.append({**row, "id": uuid.uuid4(), "test_id": test.id, "question_id": question_id})
 
     for question in questions_data:
-        answers = question.pop("answers", [])
-        question_obj = Question(test=test, **question)
-        db.add(question_obj)
-        db.flush()
+        row = dict(question)
+        answers = row.pop("answers", [])
+        row_id = uuid.uuid4()
+        client_id = row.pop("id", None)
+        if client_id:
+            question_ids[client_id] = row_id
+        question_rows.append({**row, "id": row_id, "test_id": test.id})
         for answer in answers:
-            answer_obj = Answer(test=test, question=question_obj, **answer)
-            db.add(answer_obj)
+            add_answer(answer, row_id)
 
     for answer in answers_data:
-        answer_obj = Answer(test=test, **answer)
-        db.add(answer_obj)
+        question_id = answer.get("question_id")
+        add_answer(answer, question_ids.get(question_id, question_id))
+
+    for model, rows in ((Result, result_rows), (Question, question_rows), (Answer, answer_rows)):
+        if rows:
+            db.execute(insert(model.__table__), rows)
 
-    db.flush()
     db.refresh(test)
     return test
 
 
+SLUG_MAX_LENGTH = 128
+
+
+def find_free_slug(db: Session, base: str) -> str:
+    """Return ``base`` or the lowest free ``base-N`` (N >= 2) using one prefix query."""
+    base = base[: SLUG_MAX_LENGTH - 8]
+    pattern = base.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "-%"
+    taken = set(
+        db.scalars(select(Test.slug).where(or_(Test.slug == base, Test.slug.like(pattern, escape="\\"))))
+    )
+    if base not in taken:
+        return base
+    n = 2
+    while f"{base}-{n}" in taken:
+        n += 1
+    return f"{base}-{n}"
+
+
+def create_test_with_unique_slug(
+    db: Session,
+    payload: TestCreate,
+    base: str,
+    *,
+    created_by: int,
+    created_by_username: str | None = None,
+    attempts: int = 5,
+) -> Test:
+    """Create a test under the first free slug derived from ``base``.
+
+    Concurrent creates may pick the same slug; the loser hits the unique
+    constraint inside a SAVEPOINT, which is rolled back before retrying with a
+    freshly allocated slug. The last attempt uses a random suffix.
+    """
+    for attempt in range(attempts):
+        if attempt < attempts - 1:
+            payload.slug = find_free_slug(db, base)
+        else:
+            payload.slug = f"{base[: SLUG_MAX_LENGTH - 9]}-{uuid.uuid4().hex[:8]}"
+        try:
+            with db.begin_nested():
+                return create_test(db, payload, created_by=created_by, created_by_username=created_by_username)
+        except IntegrityError as exc:
+            if "slug" not in str(exc.orig):
+                raise
+    raise RuntimeError(f"Could not allocate a unique slug for {base!r}")
+
+
 def get_test_by_id(db: Session, test_id: uuid.UUID) -> Test | None:
     return db.query(Test).filter(Test.id == test_id).first()
 
@@ -82,12 +160,140 @@ def get_test_by_slug(db: Session, slug: str) -> Test | None:
     return db.query(Test).filter(Test.slug == slug).first()
 
 
-def list_tests(db: Session) -> list[Test]:
-    return db.query(Test).order_by(Test.created_at.desc()).all()
+def with_content(query: Query) -> Query:
+    """Batch-load nested questions/answers/results: one SELECT ... IN per relationship
+    for the whole page instead of lazy loads per test and per question."""
+    return query.options(
+        selectinload(Test.questions).selectinload(Question.answers),
+        selectinload(Test.answers),
+        selectinload(Test.results),
+    )
+
+
+def encode_cursor(test: Test, field: str = "created_at") -> str:
+    raw = f"{getattr(test, field).isoformat()}|{test.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` on malformed input."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, test_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(test_id)
+    except (binascii.Error, UnicodeDecodeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+
+
+def list_tests(
+    db: Session,
+    *,
+    created_by: int | None = None,
+    public_only: bool = False,
+    limit: int | None = None,
+    cursor: str | None = None,
+    content: bool = True,
+) -> list[Test]:
+    """Newest-first listing, keyset-paginated on (created_at, id)."""
+    query = db.query(Test)
+    if created_by is not None:
+        query = query.filter(Test.created_by == created_by)
+    if public_only:
+        query = query.filter(Test.is_public.is_(True))
+    if cursor:
+        created_at, test_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Test.created_at, Test.id) < tuple_(created_at, test_id))
+    query = query.order_by(Test.created_at.desc(), Test.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    if content:
+        query = with_content(query)
+    return query.all()
+
+
+def list_tests_page(db: Session, *, limit: int, **filters) -> tuple[list[Test], str | None]:
+    """One page of ``list_tests`` plus the cursor of the next page (``None`` on the last one)."""
+    rows = list_tests(db, limit=limit + 1, **filters)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
+
+
+_IMAGE_META_FIELDS = ("image_width", "image_height", "image_color", "image_placeholder", "image_variants")
+_RESULT_FIELDS = ("order_num", "title", "description", "image_url", "min_score", "max_score")
+_QUESTION_FIELDS = ("order_num", "text", "image_url")
+_ANSWER_FIELDS = (
+    "order_num",
+    "text",
+    "explanation_title",
+    "explanation_text",
+    "image_url",
+    "weight",
+    "is_correct",
+    "result_id",
+    "question_id",
+)
+
+
+def _assign(obj, values: dict, fields: tuple[str, ...]) -> None:
+    # only touch attributes that really change, so unchanged rows emit no UPDATE
+    for field in fields:
+        if field in values and getattr(obj, field) != values[field]:
+            setattr(obj, field, values[field])
+
+
+def _assign_image_meta(obj, values: dict) -> None:
+    """Image metadata follows ``image_url``. Call before ``_assign``.
+
+    Editors that don't know the metadata send it empty: it is kept while the
+    URL stays the same and cleared when the URL changes without new metadata.
+    """
+    if any(values.get(field) is not None for field in _IMAGE_META_FIELDS):
+        _assign(obj, values, _IMAGE_META_FIELDS)
+    elif "image_url" in values and values["image_url"] != obj.image_url:
+        _assign(obj, dict.fromkeys(_IMAGE_META_FIELDS), _IMAGE_META_FIELDS)
+
+
+def _match(existing: list, incoming: list[dict]) -> tuple[list[tuple[object | None, dict]], list]:
+    """Pair incoming items with existing rows: by id first, then by order_num.
+
+    Returns ``(pairs, stale)`` where unmatched incoming items are paired with
+    ``None`` and ``stale`` holds the existing rows nobody claimed.
+    """
+    by_id = {obj.id: obj for obj in existing}
+    matched: list[object | None] = [None] * len(incoming)
+    claimed: set[uuid.UUID] = set()
+    for idx, item in enumerate(incoming):
+        obj = by_id.get(item.get("id"))
+        if obj is not None and obj.id not in claimed:
+            matched[idx] = obj
+            claimed.add(obj.id)
+    by_order: dict[int, object] = {}
+    for obj in existing:
+        if obj.id not in claimed:
+            by_order.setdefault(obj.order_num, obj)
+    for idx, item in enumerate(incoming):
+        if matched[idx] is None:
+            obj = by_order.pop(item.get("order_num"), None)
+            if obj is not None:
+                matched[idx] = obj
+                claimed.add(obj.id)
+    stale = [obj for obj in existing if obj.id not in claimed]
+    return list(zip(matched, incoming)), stale
 
 
 def update_test(db: Session, test: Test, payload: TestUpdate) -> Test:
+    """Apply a PATCH, reconciling nested content instead of recreating it.
+
+    Incoming results, questions and answers are matched to existing rows by
+    ``id`` and then by ``order_num``; matched rows are updated in place (and
+    keep their ids, so ``Answer.result_id`` links survive), the rest are
+    inserted, and rows missing from the payload are deleted.
+    """
     data = {k: v for k, v in _dump(payload).items() if v is not None}
+    if any(key in data for key in ("results", "questions", "answers")):
+        with_content(db.query(Test).filter(Test.id == test.id)).populate_existing().one()
 
     if "title" in data:
         test.title = data["title"]
@@ -110,29 +316,67 @@ def update_test(db: Session, test: Test, payload: TestUpdate) -> Test:
     if "lead_site_url" in data:
         test.lead_site_url = data["lead_site_url"]
 
+    # client id -> persisted id, so answers can reference results/questions of the payload
+    result_ids: dict[uuid.UUID, uuid.UUID] = {}
+    question_ids: dict[uuid.UUID, uuid.UUID] = {}
+
     if "results" in data:
-        test.results.clear()
-        db.flush()
+        incoming = []
         for idx, result in enumerate(data["results"]):
-            payload = dict(result)
-            if not payload.get("order_num"):
-                payload["order_num"] = idx + 1
-            db.add(Result(test=test, **payload))
+            item = dict(result)
+            if not item.get("order_num"):
+                item["order_num"] = idx + 1
+            incoming.append(item)
+        pairs, stale = _match(list(test.results), incoming)
+        for obj in stale:
+            test.results.remove(obj)
+        for obj, item in pairs:
+            if obj is None:
+                obj = Result(id=uuid.uuid4(), test=test)
+                db.add(obj)
+            _assign_image_meta(obj, item)
+            _assign(obj, item, _RESULT_FIELDS)
+            if item.get("id"):
+                result_ids[item["id"]] = obj.id
+
+    def sync_answers(existing: list[Answer], incoming: list[dict], question: Question | None) -> None:
+        pairs, stale = _match(existing, incoming)
+        for obj in stale:
+            if question is not None:
+                question.answers.remove(obj)
+            else:
+                test.answers.remove(obj)
+        for obj, item in pairs:
+            item = dict(item)
+            if item.get("result_id") in result_ids:
+                item["result_id"] = result_ids[item["result_id"]]
+            if question is not None:
+                item["question_id"] = question.id
+            elif item.get("question_id") in question_ids:
+                item["question_id"] = question_ids[item["question_id"]]
+            if obj is None:
+                obj = Answer(id=uuid.uuid4(), test=test, question=question)
+                db.add(obj)
+            _assign_image_meta(obj, item)
+            _assign(obj, item, _ANSWER_FIELDS)
 
     if "questions" in data:
-        test.questions.clear()
-        db.flush()
-        for question in data["questions"]:
-            answers = question.pop("answers", [])
-            question_obj = Question(test=test, **question)
-            db.add(question_obj)
-            db.flush()
-            for answer in answers:
-                db.add(Answer(test=test, question=question_obj, **answer))
+        pairs, stale = _match(list(test.questions), data["questions"])
+        for obj in stale:
+            test.questions.remove(obj)
+        for obj, item in pairs:
+            if obj is None:
+                obj = Question(id=uuid.uuid4(), test=test)
+                db.add(obj)
+            _assign_image_meta(obj, item)
+            _assign(obj, item, _QUESTION_FIELDS)
+            if item.get("id"):
+                question_ids[item["id"]] = obj.id
+            sync_answers(list(obj.answers), item.get("answers") or [], obj)
 
     if "answers" in data:
         # answers without question (cards)
-        test.answers = [Answer(test=test, **answer) for answer in data["answers"]]
+        sync_answers([a for a in test.answers if a.question_id is None], data["answers"], None)
 
     db.flush()
     db.refresh(test)
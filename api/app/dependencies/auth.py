@@ -1,38 +1,38 @@
 from __future__ import annotations
 
+import logging
 from datetime import datetime, timezone
 
-from fastapi import Depends, Header, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from sqlalchemy.orm import Session
-import logging
-
-logger = logging.getLogger("auth")
 
 from api.app.core.config import get_settings
 from api.app.core.telegram import TelegramInitData, parse_init_data
 from api.app.db.session import get_db
-from api.app.models import AdminToken, AdminUser
-
-
-from fastapi import Depends, Header, HTTPException, status, Request
-import logging
+from api.app.services.admin_auth import AdminPrincipal, admin_token_cache
 
 logger = logging.getLogger("auth")
 
+
 async def get_init_data(request: Request, x_telegram_init_data: str = Header(default="")):
-    """Поднимаем initData из заголовка, логируем UA и путь для диагностики Android WebView."""
+    """Поднимаем initData из заголовка; UA и путь пишем в лог при отказе (диагностика Android WebView)."""
     if not x_telegram_init_data:
-        ua = request.headers.get("user-agent", "?")
-        logger.warning("AUTH: missing X-Telegram-Init-Data ua=%s path=%s", ua, request.url.path)
+        logger.warning(
+            "AUTH: missing X-Telegram-Init-Data",
+            extra={"ua": request.headers.get("user-agent", "?"), "path": request.url.path},
+        )
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing Telegram init data")
     try:
         init = parse_init_data(x_telegram_init_data)
-        logger.info("AUTH: ok user=%s ua=%s path=%s", getattr(init.user, "id", None), request.headers.get("user-agent", "?"), request.url.path)
-        return init
     except Exception as exc:
-        ua = request.headers.get("user-agent", "?")
-        logger.exception("AUTH: invalid init data ua=%s path=%s err=%s", ua, request.url.path, exc)
+        logger.warning(
+            "AUTH: invalid init data: %s",
+            getattr(exc, "detail", exc),
+            extra={"ua": request.headers.get("user-agent", "?"), "path": request.url.path},
+        )
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Telegram init data")
+    logger.debug("AUTH: ok", extra={"user_id": init.user.id, "path": request.url.path})
+    return init
 
 
 async def get_current_admin(init_data: TelegramInitData = Depends(get_init_data)) -> TelegramInitData:
@@ -50,20 +50,12 @@ async def get_admin_db(init_data: TelegramInitData = Depends(get_current_admin),
 async def get_admin_user(
     db: Session = Depends(get_db),
     x_admin_token: str = Header(default=""),
-) -> AdminUser:
+) -> AdminPrincipal:
     if not x_admin_token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing admin token")
-    token = (
-        db.query(AdminToken)
-        .filter(AdminToken.token == x_admin_token)
-        .order_by(AdminToken.created_at.desc())
-        .first()
-    )
-    if not token:
+    admin = admin_token_cache.authenticate(db, x_admin_token)
+    if not admin:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token")
-    if token.expires_at and token.expires_at < datetime.now(timezone.utc):
+    if admin.expires_at and admin.expires_at < datetime.now(timezone.utc):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Admin token expired")
-    admin = db.query(AdminUser).filter(AdminUser.id == token.admin_id).first()
-    if not admin:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Admin not found")
     return admin
@@ -3,10 +3,18 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from api.app.api.api_v1.api import api_router
 from api.app.core.config import get_settings
+from api.app.core.logs import log_pipeline
+from api.app.services.activity import activity_buffer
+from api.app.services.admin_auth import admin_token_sweeper
+from api.app.services.export_jobs import export_job_sweeper, export_jobs
+from api.app.services.funnel import funnel_buffer
+from api.app.services.image_pool import image_pool
+from api.app.services.run_log_buffer import run_log_buffer
 
 
 def create_app() -> FastAPI:
     settings = get_settings()
+    log_pipeline.configure()
     app = FastAPI(title=settings.app_name)
     app.router.redirect_slashes = False  # disable 307 redirects for trailing slashes
     app.add_middleware(
@@ -18,6 +26,22 @@ def create_app() -> FastAPI:
         expose_headers=["*"],
     )
     app.include_router(api_router, prefix=settings.api_v1_prefix)
+    app.add_event_handler("startup", log_pipeline.start)
+    app.add_event_handler("startup", run_log_buffer.start)
+    app.add_event_handler("shutdown", run_log_buffer.stop)
+    # after the run log buffer, whose last flush still counts activity
+    app.add_event_handler("startup", activity_buffer.start)
+    app.add_event_handler("shutdown", activity_buffer.stop)
+    app.add_event_handler("startup", funnel_buffer.start)
+    app.add_event_handler("shutdown", funnel_buffer.stop)
+    app.add_event_handler("shutdown", export_jobs.shutdown)
+    app.add_event_handler("startup", export_job_sweeper.start)
+    app.add_event_handler("shutdown", export_job_sweeper.stop)
+    app.add_event_handler("shutdown", image_pool.shutdown)
+    app.add_event_handler("startup", admin_token_sweeper.start)
+    app.add_event_handler("shutdown", admin_token_sweeper.stop)
+    # last, so the other shutdown handlers' records are flushed
+    app.add_event_handler("shutdown", log_pipeline.stop)
     return app
 
 
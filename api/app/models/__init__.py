@@ -2,10 +2,16 @@ from api.app.models.test_models import (
     AdminToken,
     AdminUser,
     Answer,
+    ExportJob,
+    MediaObject,
     Question,
     Result,
+    StatsDaily,
+    StatsDailySketch,
+    StatsDailyUser,
     Test,
     TestEvent,
+    TestFunnelCounter,
     TestResponse,
     TestRunLog,
     TestType,
@@ -16,10 +22,16 @@ __all__ = [
     "Answer",
     "AdminToken",
     "AdminUser",
+    "ExportJob",
+    "MediaObject",
     "Question",
     "Result",
+    "StatsDaily",
+    "StatsDailySketch",
+    "StatsDailyUser",
     "Test",
     "TestEvent",
+    "TestFunnelCounter",
     "TestResponse",
     "TestRunLog",
     "TestType",
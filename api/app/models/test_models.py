@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 import uuid
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from enum import Enum
 
-from sqlalchemy import UUID, BigInteger, Boolean, DateTime, Enum as SqlEnum, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, UUID, BigInteger, Boolean, Date, DateTime, Enum as SqlEnum, ForeignKey, Integer, LargeBinary, String, Text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from api.app.db.session import Base
 
+# JSONB on Postgres (migrations), plain JSON elsewhere so the tables this
+# column lives on still build on SQLite (api/benchmarks/create_test.py)
+_JSON_VARIANTS = JSON().with_variant(JSONB(), "postgresql")
+
 
 class TestType(str, Enum):
     SINGLE = "single"
@@ -46,6 +50,11 @@ class Test(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
     )
+    # maintained by the ingestion endpoints (services/activity.py)
+    last_activity_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    run_log_count: Mapped[int] = mapped_column(BigInteger(), default=0, nullable=False)
+    event_count: Mapped[int] = mapped_column(BigInteger(), default=0, nullable=False)
+    response_count: Mapped[int] = mapped_column(BigInteger(), default=0, nullable=False)
 
     questions: Mapped[list[Question]] = relationship(
         "Question",
@@ -75,6 +84,12 @@ class Question(Base):
     order_num: Mapped[int] = mapped_column(Integer(), nullable=False)
     text: Mapped[str] = mapped_column(Text(), nullable=False)
     image_url: Mapped[str | None] = mapped_column(Text())
+    image_width: Mapped[int | None] = mapped_column(Integer())
+    image_height: Mapped[int | None] = mapped_column(Integer())
+    image_color: Mapped[str | None] = mapped_column(String(7))
+    image_placeholder: Mapped[str | None] = mapped_column(Text())
+    # [{url, width, height}] ordered by width, from /cards/upload-image
+    image_variants: Mapped[list | None] = mapped_column(_JSON_VARIANTS)
 
     test: Mapped[Test] = relationship("Test", back_populates="questions")
     answers: Mapped[list[Answer]] = relationship(
@@ -94,6 +109,12 @@ class Result(Base):
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str | None] = mapped_column(Text())
     image_url: Mapped[str | None] = mapped_column(Text())
+    image_width: Mapped[int | None] = mapped_column(Integer())
+    image_height: Mapped[int | None] = mapped_column(Integer())
+    image_color: Mapped[str | None] = mapped_column(String(7))
+    image_placeholder: Mapped[str | None] = mapped_column(Text())
+    # [{url, width, height}] ordered by width, from /cards/upload-image
+    image_variants: Mapped[list | None] = mapped_column(_JSON_VARIANTS)
     min_score: Mapped[int | None] = mapped_column(Integer())
     max_score: Mapped[int | None] = mapped_column(Integer())
 
@@ -115,6 +136,12 @@ class Answer(Base):
     explanation_title: Mapped[str | None] = mapped_column(String(255))
     explanation_text: Mapped[str | None] = mapped_column(Text())
     image_url: Mapped[str | None] = mapped_column(Text())
+    image_width: Mapped[int | None] = mapped_column(Integer())
+    image_height: Mapped[int | None] = mapped_column(Integer())
+    image_color: Mapped[str | None] = mapped_column(String(7))
+    image_placeholder: Mapped[str | None] = mapped_column(Text())
+    # [{url, width, height}] ordered by width, from /cards/upload-image
+    image_variants: Mapped[list | None] = mapped_column(_JSON_VARIANTS)
     weight: Mapped[int | None] = mapped_column(Integer())
     is_correct: Mapped[bool | None] = mapped_column(Boolean())
 
@@ -180,6 +207,13 @@ class TestResponse(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
     )
+    # moves on insert and on every edit; export fingerprints read max() per test
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
 
     test: Mapped[Test | None] = relationship("Test")
 
@@ -200,6 +234,57 @@ class TestEvent(Base):
     test: Mapped[Test | None] = relationship("Test")
 
 
+class TestFunnelCounter(Base):
+    __tablename__ = "test_funnel_counters"
+
+    test_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("tests.id", ondelete="CASCADE"), primary_key=True
+    )
+    event_type: Mapped[str] = mapped_column(String(32), primary_key=True)
+    question_index: Mapped[int] = mapped_column(Integer(), primary_key=True, default=0)
+    count: Mapped[int] = mapped_column(BigInteger(), nullable=False, default=0)
+
+
+class ExportJob(Base):
+    __tablename__ = "export_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    test_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("tests.id", ondelete="CASCADE"), nullable=False)
+    format: Mapped[str] = mapped_column(String(8), nullable=False)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued")
+    s3_key: Mapped[str | None] = mapped_column(Text())
+    row_count: Mapped[int | None] = mapped_column(Integer())
+    size_bytes: Mapped[int | None] = mapped_column(BigInteger())
+    error: Mapped[str | None] = mapped_column(Text())
+    requested_by: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+
+class MediaObject(Base):
+    """An uploaded file keyed by the hash of the uploaded bytes and the processing applied to them."""
+
+    __tablename__ = "media_objects"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    params: Mapped[str] = mapped_column(String(255), primary_key=True)
+    key: Mapped[str] = mapped_column(Text(), nullable=False)
+    url: Mapped[str] = mapped_column(Text(), nullable=False)
+    content_type: Mapped[str | None] = mapped_column(String(255))
+    size_bytes: Mapped[int] = mapped_column(BigInteger(), nullable=False)
+    width: Mapped[int | None] = mapped_column(Integer())
+    height: Mapped[int | None] = mapped_column(Integer())
+    color: Mapped[str | None] = mapped_column(String(7))
+    placeholder: Mapped[str | None] = mapped_column(Text())
+    variants: Mapped[list | None] = mapped_column(JSONB())
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+
+
 class AdminUser(Base):
     __tablename__ = "admin_users"
 
@@ -218,10 +303,40 @@ class AdminToken(Base):
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     admin_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("admin_users.id", ondelete="CASCADE"))
-    token: Mapped[str] = mapped_column(String(128), unique=True, nullable=False)
+    # SHA-256 hex digest of the token handed to the client
+    token_hash: Mapped[str] = mapped_column(String(128), unique=True, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
     )
     expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     admin: Mapped[AdminUser] = relationship("AdminUser")
+
+
+class StatsDaily(Base):
+    __tablename__ = "stats_daily"
+
+    day: Mapped[date] = mapped_column(Date(), primary_key=True)
+    tests_created: Mapped[int] = mapped_column(Integer(), nullable=False, default=0)
+    tests_opened: Mapped[int] = mapped_column(Integer(), nullable=False, default=0)
+    tests_completed: Mapped[int] = mapped_column(Integer(), nullable=False, default=0)
+    sealed: Mapped[bool] = mapped_column(Boolean(), nullable=False, default=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+
+
+class StatsDailyUser(Base):
+    __tablename__ = "stats_daily_users"
+
+    day: Mapped[date] = mapped_column(Date(), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger(), primary_key=True)
+
+
+class StatsDailySketch(Base):
+    __tablename__ = "stats_daily_sketches"
+
+    day: Mapped[date] = mapped_column(Date(), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)
+    registers: Mapped[bytes] = mapped_column(LargeBinary(), nullable=False)
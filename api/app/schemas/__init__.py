@@ -9,6 +9,7 @@ from api.app.schemas.tests import (
     TestLogCreate,
     TestCreate,
     TestRead,
+    TestSummary,
     TestType,
     TestUpdate,
 )
@@ -25,6 +26,7 @@ __all__ = [
     "TestLogCreate",
     "TestCreate",
     "TestRead",
+    "TestSummary",
     "TestType",
     "TestUpdate",
     "StatsResponse",
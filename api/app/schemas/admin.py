@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import uuid
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -28,6 +30,10 @@ class AdminTestListItem(BaseModel):
     lead_collect_email: bool
     lead_collect_site: bool
     lead_site_url: str | None = None
+    last_activity_at: str | None = None
+    run_log_count: int = 0
+    event_count: int = 0
+    response_count: int = 0
 
 
 class AdminAnswer(BaseModel):
@@ -63,6 +69,8 @@ class AdminTestFunnel(BaseModel):
 
 
 class AdminResponseRow(BaseModel):
+    id: uuid.UUID
+    created_at: str | None = None
     user_id: int
     user_username: str | None = None
     result_title: str | None = None
@@ -80,4 +88,22 @@ class AdminTestReport(BaseModel):
     questions: list[AdminQuestion]
     results: list[AdminResult]
     funnel: AdminTestFunnel
-    responses: list[AdminResponseRow]
+    response_count: int
+    # question id -> answer text -> number of responses; only with ?include=distribution
+    distribution: dict[str, dict[str, int]] | None = None
+
+
+class ExportJobRead(BaseModel):
+    id: uuid.UUID
+    test_id: uuid.UUID
+    format: str
+    status: str
+    row_count: int | None = None
+    size_bytes: int | None = None
+    error: str | None = None
+    created_at: datetime
+    finished_at: datetime | None = None
+    download_url: str | None = None
+
+    class Config:
+        orm_mode = True
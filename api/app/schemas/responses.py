@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from pydantic import BaseModel
+from datetime import datetime
+
+from pydantic import BaseModel, Field
 
 
 class AnswerPayload(BaseModel):
@@ -19,6 +21,11 @@ class TestResponseCreate(BaseModel):
 class TestEventCreate(BaseModel):
     event_type: str
     question_index: int | None = None
+    client_ts: datetime | None = None
+
+
+class TestEventBatch(BaseModel):
+    events: list[TestEventCreate] = Field(..., min_items=1, max_items=100)
 
 
 class LeadUpdate(BaseModel):
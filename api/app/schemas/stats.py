@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -11,3 +13,34 @@ class StatsResponse(BaseModel):
     monthly_created_users: int
     monthly_opened_users: int
     monthly_completed_users: int
+    # user counts come from HyperLogLog sketches unless ?exact=true
+    approximate: bool = False
+    uniques_error: float | None = None
+
+
+class StatsBucket(BaseModel):
+    start: datetime
+    tests_created: int
+    tests_opened: int
+    tests_completed: int
+    created_users: int
+    opened_users: int
+    completed_users: int
+
+
+class StatsSeries(BaseModel):
+    bucket: str
+    approximate: bool
+    uniques_error: float | None = None
+    items: list[StatsBucket]
+
+
+class LogBufferStats(BaseModel):
+    queue_depth: int
+    queue_capacity: int
+    enqueued: int
+    flushed: int
+    dropped: int
+    failed: int
+    batches: int
+    last_flush_at: datetime | None = None
@@ -8,18 +8,36 @@ from pydantic import BaseModel, Field, ConfigDict
 
 from api.app.models import TestType
 
+# a 16px LQIP data URI is well under 1 KB; the cap keeps payloads bounded
+IMAGE_PLACEHOLDER_MAX_LENGTH = 4096
+IMAGE_VARIANTS_MAX = 8
+
+
+class ImageVariant(BaseModel):
+    """One responsive width of an image; the runner builds ``srcset`` from these."""
+
+    url: str
+    width: int = Field(..., ge=1)
+    height: int | None = Field(None, ge=1)
+
 
 class ResultBase(BaseModel):
     order_num: int | None = None
     title: str
     description: str | None = None
     image_url: str | None = None
+    image_width: int | None = Field(None, ge=1)
+    image_height: int | None = Field(None, ge=1)
+    image_color: str | None = Field(None, regex=r"^#[0-9a-fA-F]{6}$")
+    image_placeholder: str | None = Field(None, max_length=IMAGE_PLACEHOLDER_MAX_LENGTH)
+    image_variants: list[ImageVariant] | None = Field(None, max_items=IMAGE_VARIANTS_MAX)
     min_score: int | None = None
     max_score: int | None = None
 
 
 class ResultCreate(ResultBase):
-    pass
+    # client-side reference, lets answers point at a result of the same payload
+    id: uuid.UUID | None = None
 
 
 class ResultRead(ResultBase):
@@ -36,6 +54,11 @@ class AnswerBase(BaseModel):
     explanation_title: str | None = None
     explanation_text: str | None = None
     image_url: str | None = None
+    image_width: int | None = Field(None, ge=1)
+    image_height: int | None = Field(None, ge=1)
+    image_color: str | None = Field(None, regex=r"^#[0-9a-fA-F]{6}$")
+    image_placeholder: str | None = Field(None, max_length=IMAGE_PLACEHOLDER_MAX_LENGTH)
+    image_variants: list[ImageVariant] | None = Field(None, max_items=IMAGE_VARIANTS_MAX)
     weight: int | None = None
     is_correct: bool | None = None
     result_id: uuid.UUID | None = None
@@ -43,7 +66,7 @@ class AnswerBase(BaseModel):
 
 
 class AnswerCreate(AnswerBase):
-    pass
+    id: uuid.UUID | None = None
 
 
 class AnswerRead(AnswerBase):
@@ -58,9 +81,15 @@ class QuestionBase(BaseModel):
     order_num: int
     text: str
     image_url: str | None = None
+    image_width: int | None = Field(None, ge=1)
+    image_height: int | None = Field(None, ge=1)
+    image_color: str | None = Field(None, regex=r"^#[0-9a-fA-F]{6}$")
+    image_placeholder: str | None = Field(None, max_length=IMAGE_PLACEHOLDER_MAX_LENGTH)
+    image_variants: list[ImageVariant] | None = Field(None, max_items=IMAGE_VARIANTS_MAX)
 
 
 class QuestionCreate(QuestionBase):
+    id: uuid.UUID | None = None
     answers: list[AnswerCreate] = Field(default_factory=list)
 
 
@@ -125,6 +154,20 @@ class TestRead(TestBase):
         json_encoders = {uuid.UUID: str, datetime: lambda dt: dt.isoformat()}
 
 
+class TestSummary(TestBase):
+    """List projection of a test without nested questions/answers/results."""
+
+    id: uuid.UUID
+    slug: str
+    created_by: int
+    created_by_username: str | None = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+        json_encoders = {uuid.UUID: str, datetime: lambda dt: dt.isoformat()}
+
+
 class SlugResponse(BaseModel):
     slug: str
 
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Literal
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+
+from api.app.core.config import get_settings
+from api.app.db.session import SessionLocal
+from api.app.models import Test
+from api.app.services.counter_buffer import CounterBuffer
+
+ActivityKind = Literal["run_log", "event", "response"]
+
+_tests = Test.__table__
+
+
+@dataclass(frozen=True)
+class _Activity:
+    run_log: int = 0
+    event: int = 0
+    response: int = 0
+    at: datetime | None = None
+
+    def __add__(self, other: _Activity) -> _Activity:
+        return _Activity(
+            run_log=self.run_log + other.run_log,
+            event=self.event + other.event,
+            response=self.response + other.response,
+            at=max(filter(None, (self.at, other.at)), default=None),
+        )
+
+
+def record_activity(kind: ActivityKind, test_ids: Iterable[uuid.UUID | None], *, at: datetime | None = None) -> None:
+    """Count every occurrence in ``test_ids`` towards ``tests.<kind>_count`` and ``last_activity_at``.
+
+    Call after the rows were committed. The bump goes through
+    ``activity_buffer`` and reaches ``tests`` within ``activity_flush_interval``
+    seconds. ``None`` ids (deleted tests) are skipped.
+    """
+    counts = Counter(test_id for test_id in test_ids if test_id is not None)
+    if not counts:
+        return
+    at = at or datetime.now(timezone.utc)
+    activity_buffer.add((test_id, _Activity(**{kind: count}, at=at)) for test_id, count in counts.items())
+
+
+def touch_activity(test_id: uuid.UUID, *, at: datetime | None = None) -> None:
+    """Move ``last_activity_at`` forward without counting a new occurrence (e.g. an edited response)."""
+    activity_buffer.add([(test_id, _Activity(at=at or datetime.now(timezone.utc)))])
+
+
+def _apply(db: Session, pending: dict[uuid.UUID, _Activity]) -> None:
+    """One UPDATE per test, sent as a single executemany."""
+    last_activity_at = _tests.c.last_activity_at
+    activity_at = bindparam("b_at", type_=last_activity_at.type)
+    stmt = (
+        update(_tests)
+        .where(_tests.c.id == bindparam("b_test_id"))
+        .values(
+            {
+                _tests.c.run_log_count: _tests.c.run_log_count + bindparam("b_run_log"),
+                _tests.c.event_count: _tests.c.event_count + bindparam("b_event"),
+                _tests.c.response_count: _tests.c.response_count + bindparam("b_response"),
+                last_activity_at: func.greatest(func.coalesce(last_activity_at, activity_at), activity_at),
+            }
+        )
+    )
+    # fixed order keeps flushes from different workers touching the same tests from deadlocking
+    db.execute(
+        stmt,
+        [
+            {"b_test_id": test_id, "b_run_log": a.run_log, "b_event": a.event, "b_response": a.response, "b_at": a.at}
+            for test_id, a in sorted(pending.items())
+        ],
+    )
+
+
+activity_buffer = CounterBuffer(
+    "activity", SessionLocal, _apply, flush_interval=get_settings().activity_flush_interval
+)
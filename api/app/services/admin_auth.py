@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from api.app.core.cache import LRUCache
+from api.app.core.config import get_settings
+from api.app.db.session import SessionLocal
+from api.app.models import AdminToken, AdminUser
+
+logger = logging.getLogger("auth")
+
+
+def hash_token(raw: str) -> str:
+    """Tokens are stored and cached only as their SHA-256 hex digest."""
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class AdminPrincipal:
+    """The authenticated admin, detached from any session."""
+
+    id: uuid.UUID
+    username: str
+    scope: str
+    owner_username: str | None
+    expires_at: datetime | None
+
+
+class AdminTokenCache:
+    """Verified admin tokens keyed by token hash.
+
+    An entry lives ``ttl`` seconds but never past the token's ``expires_at``,
+    so a cached token cannot outlive its DB row's validity. Unknown and
+    expired tokens are not cached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        self._cache = LRUCache(maxsize, ttl=ttl)
+
+    def authenticate(self, db: Session, raw_token: str) -> AdminPrincipal | None:
+        token_hash = hash_token(raw_token)
+        principal = self._cache.get(token_hash)
+        if principal is None:
+            principal = self._load(db, token_hash)
+            if principal is None:
+                return None
+            ttl = self.ttl
+            if principal.expires_at is not None:
+                ttl = min(ttl, (principal.expires_at - datetime.now(timezone.utc)).total_seconds())
+            if ttl > 0:
+                self._cache.set(token_hash, principal, ttl=ttl)
+        return principal
+
+    def invalidate(self, raw_token: str) -> None:
+        self._cache.pop(hash_token(raw_token))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def _load(self, db: Session, token_hash: str) -> AdminPrincipal | None:
+        row = db.execute(
+            select(AdminUser.id, AdminUser.username, AdminUser.scope, AdminUser.owner_username, AdminToken.expires_at)
+            .join(AdminToken, AdminToken.admin_id == AdminUser.id)
+            .where(AdminToken.token_hash == token_hash)
+        ).first()
+        return AdminPrincipal(**row._asdict()) if row is not None else None
+
+
+class AdminTokenSweeper:
+    """Daemon thread deleting expired ``admin_tokens`` rows every ``interval`` seconds."""
+
+    def __init__(self, session_factory: Callable[[], Session], *, interval: float):
+        self._session_factory = session_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="admin-token-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    def sweep(self) -> int:
+        with self._session_factory() as db:
+            result = db.execute(delete(AdminToken).where(AdminToken.expires_at < datetime.now(timezone.utc)))
+            db.commit()
+            return result.rowcount or 0
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                removed = self.sweep()
+            except Exception:
+                logger.exception("admin token sweep failed")
+                continue
+            if removed:
+                logger.info("admin token sweep removed %d expired tokens", removed)
+
+
+_settings = get_settings()
+admin_token_cache = AdminTokenCache(_settings.admin_token_cache_size, ttl=_settings.admin_token_cache_ttl)
+admin_token_sweeper = AdminTokenSweeper(SessionLocal, interval=_settings.admin_token_sweep_interval)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import logging
+import operator
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Hashable, Iterable
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("counter_buffer")
+
+
+class CounterBuffer:
+    """Write-behind aggregation of counter deltas.
+
+    ``add`` merges deltas into an in-memory map under a lock and never
+    touches the database, so hot rows (a popular test's counters) are not
+    locked by every request. A daemon thread swaps the map out every
+    ``flush_interval`` seconds and hands it to ``apply(db, pending)``, which
+    writes it in one transaction; a failed flush is logged and its deltas
+    are dropped, like a failed run log batch. ``stop`` flushes what is left;
+    deltas added after that are dropped until ``start`` reopens the buffer.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        session_factory: Callable[[], Session],
+        apply: Callable[[Session, dict[Hashable, Any]], None],
+        *,
+        flush_interval: float,
+        merge: Callable[[Any, Any], Any] = operator.add,
+    ):
+        self.name = name
+        self._session_factory = session_factory
+        self._apply = apply
+        self._merge = merge
+        self.flush_interval = flush_interval
+        self._pending: dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self.added = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        self.last_flush_at: datetime | None = None
+
+    def start(self) -> None:
+        with self._lock:
+            self._closed = False
+            self._start_locked()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            self._closed = True
+            self._stop.set()
+            thread = self._thread
+        if thread is None:
+            self.flush()
+            return
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("%s buffer still flushing after %.1fs", self.name, timeout)
+            return
+        with self._lock:
+            if self._thread is thread:
+                self._thread = None
+
+    def add(self, deltas: Iterable[tuple[Hashable, Any]]) -> bool:
+        with self._lock:
+            if self._closed:
+                self.dropped += 1
+                return False
+            if self._thread is None:
+                self._start_locked()
+            pending = self._pending
+            for key, delta in deltas:
+                current = pending.get(key)
+                pending[key] = delta if current is None else self._merge(current, delta)
+            self.added += 1
+        return True
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            with self._session_factory() as db:
+                self._apply(db, pending)
+                db.commit()
+        except Exception:
+            with self._lock:
+                self.failed += len(pending)
+            logger.exception("%s flush failed, dropped %d deltas", self.name, len(pending))
+            return
+        with self._lock:
+            self.flushed += len(pending)
+            self.last_flush_at = datetime.now(timezone.utc)
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "added": self.added,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "last_flush_at": self.last_flush_at,
+        }
+
+    def _start_locked(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-buffer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
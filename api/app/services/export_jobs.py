@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from api.app.core import s3
+from api.app.core.config import get_settings
+from api.app.db.session import SessionLocal
+from api.app.models import ExportJob, Test, TestResponse
+from api.app.services.exports import MEDIA_TYPES, ExportFormat, ExportLayout, iter_rows, write_csv, write_xlsx
+
+logger = logging.getLogger("export_jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_WRITERS = {"csv": write_csv, "xlsx": write_xlsx}
+
+
+def fingerprint(db: Session, test: Test, layout: ExportLayout, export_format: ExportFormat) -> str:
+    """Identifies the export content: same fingerprint, same file.
+
+    Only responses move it: ``max(updated_at)`` changes on every new or
+    edited response and the row count guards against equal timestamps (one
+    aggregate over ``ix_test_responses_test_updated_at``). Opens and events
+    don't. The layout hash covers edits to the test's questions and lead
+    settings.
+    """
+    count, changed_at = db.execute(
+        select(func.count(), func.max(TestResponse.updated_at)).where(TestResponse.test_id == test.id)
+    ).one()
+    changed = changed_at.isoformat() if changed_at else ""
+    raw = "|".join([str(test.id), export_format, changed, str(count), layout.structure_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ExportJobRunner:
+    """Runs response exports on a small thread pool and stores the files in S3.
+
+    Job state lives in ``export_jobs`` so any API process can report on it.
+    ``shutdown`` marks the jobs this process had not finished as failed; a
+    queued/running job older than ``job_timeout`` seconds (the process was
+    killed) is treated as lost too and is not reused.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], *, workers: int, job_timeout: int):
+        self._session_factory = session_factory
+        self._workers = workers
+        self._job_timeout = timedelta(seconds=job_timeout)
+        self._executor: ThreadPoolExecutor | None = None
+        self._inflight: set[uuid.UUID] = set()
+        self._lock = threading.Lock()
+
+    def enqueue(self, db: Session, test: Test, export_format: ExportFormat, *, requested_by=None) -> ExportJob:
+        layout = ExportLayout.for_test(test)
+        key = fingerprint(db, test, layout, export_format)
+        reusable = self._reusable(db, test.id, key)
+        if reusable is not None:
+            return reusable
+        job = ExportJob(
+            test_id=test.id,
+            format=export_format,
+            fingerprint=key,
+            status=QUEUED,
+            requested_by=requested_by,
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._submit(job.id, layout)
+        return job
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            interrupted, self._inflight = self._inflight, set()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if not interrupted:
+            return
+        try:
+            with self._session_factory() as db:
+                db.execute(
+                    update(ExportJob)
+                    .where(ExportJob.id.in_(interrupted), ExportJob.status.in_((QUEUED, RUNNING)))
+                    .values(status=FAILED, error="interrupted by shutdown", finished_at=datetime.now(timezone.utc))
+                )
+                db.commit()
+        except Exception:
+            logger.exception("could not mark %d interrupted export jobs as failed", len(interrupted))
+
+    def sweep(self, retention: timedelta) -> int:
+        """Delete jobs older than ``retention`` and every export file in S3 older than that.
+
+        Files are matched by age rather than by row, so the files of deleted
+        tests (whose jobs went with them) are removed as well.
+        """
+        cutoff = datetime.now(timezone.utc) - retention
+        # rows first, so no request is handed a job whose file is already gone
+        with self._session_factory() as db:
+            result = db.execute(delete(ExportJob).where(ExportJob.created_at < cutoff))
+            db.commit()
+        removed = result.rowcount or 0
+        removed_files = s3.delete_older_than("exports/", cutoff)
+        if removed or removed_files:
+            logger.info("export sweep removed %d jobs and %d files", removed, removed_files)
+        return removed
+
+    def _reusable(self, db: Session, test_id: uuid.UUID, key: str) -> ExportJob | None:
+        alive_after = datetime.now(timezone.utc) - self._job_timeout
+        return db.scalars(
+            select(ExportJob)
+            .where(
+                ExportJob.test_id == test_id,
+                ExportJob.fingerprint == key,
+                or_(ExportJob.status == DONE, and_(ExportJob.status != FAILED, ExportJob.created_at >= alive_after)),
+            )
+            .order_by(ExportJob.created_at.desc())
+            .limit(1)
+        ).first()
+
+    def _submit(self, job_id: uuid.UUID, layout: ExportLayout) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="export")
+            self._inflight.add(job_id)
+            self._executor.submit(self._run, job_id, layout)
+
+    def _run(self, job_id: uuid.UUID, layout: ExportLayout) -> None:
+        try:
+            self._export(job_id, layout)
+        finally:
+            with self._lock:
+                self._inflight.discard(job_id)
+
+    def _export(self, job_id: uuid.UUID, layout: ExportLayout) -> None:
+        with self._session_factory() as db:
+            job = db.get(ExportJob, job_id)
+            if job is None:
+                return
+            job.status = RUNNING
+            db.commit()
+            fd, path = tempfile.mkstemp(suffix=f".{job.format}")
+            os.close(fd)
+            try:
+                rows = 0
+
+                def counted():
+                    nonlocal rows
+                    for values in iter_rows(self._session_factory, layout):
+                        rows += 1
+                        yield values
+
+                _WRITERS[job.format](layout, counted(), path)
+                filename = f"{layout.filename}.{job.format}"
+                job.s3_key = s3.put_file(
+                    path,
+                    key=f"exports/{layout.test_id}/{job.fingerprint}.{job.format}",
+                    content_type=MEDIA_TYPES[job.format],
+                    content_disposition=f"attachment; filename={filename}",
+                )
+                job.row_count = rows
+                job.size_bytes = os.path.getsize(path)
+                job.status = DONE
+            except Exception as exc:
+                logger.exception("export job %s failed", job_id)
+                job.status = FAILED
+                job.error = str(exc)[:500]
+            finally:
+                os.unlink(path)
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+
+
+_settings = get_settings()
+export_jobs = ExportJobRunner(
+    SessionLocal,
+    workers=_settings.export_workers,
+    job_timeout=_settings.export_job_timeout,
+)
+
+
+class ExportJobSweeper:
+    """Daemon thread running ``ExportJobRunner.sweep`` every ``interval`` seconds."""
+
+    def __init__(self, runner: ExportJobRunner, *, interval: float, retention: float):
+        self._runner = runner
+        self.interval = interval
+        self.retention = timedelta(seconds=retention)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="export-job-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._runner.sweep(self.retention)
+            except Exception:
+                logger.exception("export sweep failed")
+
+
+export_job_sweeper = ExportJobSweeper(
+    export_jobs,
+    interval=_settings.export_sweep_interval,
+    retention=_settings.export_retention,
+)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Literal
+
+from openpyxl import Workbook
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from api.app.models import Test, TestResponse
+
+ExportFormat = Literal["xlsx", "csv"]
+
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# rows fetched per round trip from the server-side cursor
+CHUNK_SIZE = 1000
+# bytes per chunk when streaming the finished XLSX file
+FILE_CHUNK_SIZE = 64 * 1024
+
+_RESPONSE_COLUMNS = (
+    TestResponse.user_id,
+    TestResponse.result_title,
+    TestResponse.answers,
+    TestResponse.lead_name,
+    TestResponse.lead_phone,
+    TestResponse.lead_email,
+    TestResponse.lead_site,
+    TestResponse.lead_site_clicked,
+)
+
+
+def response_answers(raw: Any) -> dict[str, str]:
+    """Normalize stored ``TestResponse.answers`` (list of entries or dict) to ``{question key: text}``."""
+    answers: dict[str, str] = {}
+    raw = raw or {}
+    if isinstance(raw, list):
+        for entry in raw:
+            if not isinstance(entry, dict):
+                continue
+            qid = str(entry.get("question_id") or entry.get("order_num") or "")
+            answers[qid] = str(entry.get("answer_text") or "")
+    elif isinstance(raw, dict):
+        answers = {str(k): str(v) for k, v in raw.items()}
+    return answers
+
+
+@dataclass(frozen=True)
+class ExportLayout:
+    """Column layout of a test's response export, detached from the session."""
+
+    test_id: uuid.UUID
+    slug: str
+    question_keys: tuple[str, ...]
+    headers: tuple[str, ...]
+    lead_name: bool
+    lead_phone: bool
+    lead_email: bool
+    lead_site: bool
+
+    @classmethod
+    def for_test(cls, test: Test) -> "ExportLayout":
+        questions = sorted(test.questions, key=lambda q: q.order_num)
+        lead = test.lead_enabled
+        flags = {
+            "lead_name": lead and test.lead_collect_name,
+            "lead_phone": lead and test.lead_collect_phone,
+            "lead_email": lead and test.lead_collect_email,
+            "lead_site": lead and test.lead_collect_site,
+        }
+        headers = ["telegram_id", "result_title", *(q.text for q in questions)]
+        headers.extend(name for name in ("lead_name", "lead_phone", "lead_email") if flags[name])
+        if flags["lead_site"]:
+            headers.extend(["lead_site", "lead_site_clicked"])
+        return cls(
+            test_id=test.id,
+            slug=test.slug,
+            question_keys=tuple(str(q.id) for q in questions),
+            headers=tuple(headers),
+            **flags,
+        )
+
+    @property
+    def structure_hash(self) -> str:
+        """Changes whenever the column set (questions, lead fields) changes."""
+        raw = "\x1f".join([*self.question_keys, *self.headers])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @property
+    def filename(self) -> str:
+        return f"test-{self.slug}-responses"
+
+    def row(self, response) -> list[Any]:
+        answers = response_answers(response.answers)
+        values = [response.user_id, response.result_title or ""]
+        values.extend(answers.get(key) or "" for key in self.question_keys)
+        if self.lead_name:
+            values.append(response.lead_name or "")
+        if self.lead_phone:
+            values.append(response.lead_phone or "")
+        if self.lead_email:
+            values.append(response.lead_email or "")
+        if self.lead_site:
+            values.append(response.lead_site or "")
+            values.append("yes" if response.lead_site_clicked else "no")
+        return values
+
+
+def iter_rows(session_factory: Callable[[], Session], layout: ExportLayout) -> Iterator[list[Any]]:
+    """Export rows, newest first, read through a server-side cursor ``CHUNK_SIZE`` rows at a time.
+
+    Opens its own session: the request-scoped one is closed before a
+    streaming response body is produced.
+    """
+    with session_factory() as db:
+        result = db.execute(
+            select(*_RESPONSE_COLUMNS)
+            .where(TestResponse.test_id == layout.test_id)
+            .order_by(TestResponse.created_at.desc())
+            .execution_options(yield_per=CHUNK_SIZE)
+        )
+        for response in result:
+            yield layout.row(response)
+
+
+def stream_csv(layout: ExportLayout, rows: Iterator[list[Any]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    # BOM so Excel opens UTF-8 (Cyrillic) correctly
+    buf.write("\ufeff")
+    writer = csv.writer(buf)
+    writer.writerow(layout.headers)
+    for idx, values in enumerate(rows, start=1):
+        writer.writerow(values)
+        if idx % CHUNK_SIZE == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def write_csv(layout: ExportLayout, rows: Iterator[list[Any]], path: str) -> None:
+    with open(path, "wb") as fh:
+        for chunk in stream_csv(layout, rows):
+            fh.write(chunk)
+
+
+def write_xlsx(layout: ExportLayout, rows: Iterator[list[Any]], path: str) -> None:
+    """Write the workbook in write-only mode: rows go to disk as they are appended."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Responses")
+    ws.append(list(layout.headers))
+    for values in rows:
+        ws.append(values)
+    wb.save(path)
+
+
+def stream_xlsx(layout: ExportLayout, rows: Iterator[list[Any]]) -> Iterator[bytes]:
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        write_xlsx(layout, rows, path)
+        with open(path, "rb") as fh:
+            while chunk := fh.read(FILE_CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.unlink(path)
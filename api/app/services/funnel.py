@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import uuid
+from collections import Counter
+from typing import Iterable
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from api.app.core.config import get_settings
+from api.app.db.session import SessionLocal
+from api.app.models import Test, TestEvent, TestFunnelCounter
+from api.app.services.counter_buffer import CounterBuffer
+
+FUNNEL_EVENTS = ("screen_open", "answer", "lead_form_submit", "site_click")
+
+# counters key "no question" as 0, question indexes start at 1
+_NO_QUESTION = 0
+
+FunnelCounts = dict[tuple[str, int], int]
+
+
+def counters_enabled() -> bool:
+    return get_settings().funnel_counters_enabled
+
+
+def record_events(test_id: uuid.UUID, events: Iterable[tuple[str, int | None]]) -> None:
+    """Add ``(event_type, question_index)`` occurrences to the per-test counters.
+
+    Call after the event rows were committed. The deltas go through
+    ``funnel_buffer`` and reach ``test_funnel_counters`` within
+    ``funnel_flush_interval`` seconds, so ingestion never waits on the
+    counter rows of a popular test.
+    """
+    if not counters_enabled():
+        return
+    counts = Counter((event_type, question_index or _NO_QUESTION) for event_type, question_index in events)
+    if counts:
+        funnel_buffer.add(
+            ((test_id, event_type, question_index), count) for (event_type, question_index), count in counts.items()
+        )
+
+
+def _apply(db: Session, pending: dict[tuple[uuid.UUID, str, int], int]) -> None:
+    """One upsert for everything pending; counters of tests deleted meanwhile are dropped."""
+    alive = set(db.scalars(select(Test.id).where(Test.id.in_({key[0] for key in pending}))))
+    # fixed key order keeps flushes from different workers from deadlocking
+    rows = [
+        {"test_id": test_id, "event_type": event_type, "question_index": question_index, "count": count}
+        for (test_id, event_type, question_index), count in sorted(pending.items())
+        if test_id in alive
+    ]
+    if not rows:
+        return
+    stmt = pg_insert(TestFunnelCounter.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["test_id", "event_type", "question_index"],
+        set_={"count": TestFunnelCounter.__table__.c.count + stmt.excluded.count},
+    )
+    db.execute(stmt)
+
+
+def funnel_counts(db: Session, test_id: uuid.UUID) -> FunnelCounts:
+    """Event counts of one test keyed by ``(event_type, question_index)``.
+
+    Reads the counter table when enabled, otherwise aggregates ``test_events``
+    in a single grouped query (covered by ``ix_test_events_test_event_question``).
+    """
+    if counters_enabled():
+        rows = db.execute(
+            select(TestFunnelCounter.event_type, TestFunnelCounter.question_index, TestFunnelCounter.count).where(
+                TestFunnelCounter.test_id == test_id, TestFunnelCounter.event_type.in_(FUNNEL_EVENTS)
+            )
+        )
+    else:
+        rows = db.execute(
+            select(TestEvent.event_type, TestEvent.question_index, func.count())
+            .where(TestEvent.test_id == test_id, TestEvent.event_type.in_(FUNNEL_EVENTS))
+            .group_by(TestEvent.event_type, TestEvent.question_index)
+        )
+    counts: FunnelCounts = Counter()
+    for event_type, question_index, count in rows:
+        counts[(event_type, question_index or _NO_QUESTION)] += count
+    return counts
+
+
+def rebuild_counters(db: Session, test_id: uuid.UUID | None = None) -> None:
+    """Recompute counters from ``test_events`` (one test, or all when ``test_id`` is None)."""
+    question_index = func.coalesce(TestEvent.question_index, _NO_QUESTION)
+    source = (
+        select(TestEvent.test_id, TestEvent.event_type, question_index, func.count())
+        .where(TestEvent.test_id.is_not(None))
+        .group_by(TestEvent.test_id, TestEvent.event_type, question_index)
+    )
+    clear = delete(TestFunnelCounter)
+    if test_id is not None:
+        source = source.where(TestEvent.test_id == test_id)
+        clear = clear.where(TestFunnelCounter.test_id == test_id)
+    db.execute(clear)
+    db.execute(
+        insert(TestFunnelCounter).from_select(["test_id", "event_type", "question_index", "count"], source)
+    )
+
+
+funnel_buffer = CounterBuffer("funnel", SessionLocal, _apply, flush_interval=get_settings().funnel_flush_interval)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from api.app.core.config import get_settings
+
+logger = logging.getLogger("image_pool")
+
+
+class ImagePoolBusy(RuntimeError):
+    """Every worker is busy and the wait queue is full."""
+
+
+class ImagePoolUnavailable(RuntimeError):
+    """The pool could not accept the job: it broke again right after a restart, or is shut down."""
+
+
+class ImagePool:
+    """CPU-bound image work in a process pool, off the event loop.
+
+    At most ``workers + queue_limit`` jobs are admitted at once; past that
+    ``run`` raises ``ImagePoolBusy`` immediately instead of queueing. A job
+    holds its slot until the worker actually finishes it, so a job that
+    timed out for its caller still counts against the limit. Workers are
+    spawned (not forked) because the API process runs background threads.
+    """
+
+    def __init__(self, *, workers: int, queue_limit: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` in a worker.
+
+        Raises ``ImagePoolBusy``, ``ImagePoolUnavailable``, ``asyncio.TimeoutError``,
+        ``BrokenProcessPool`` (the worker died mid-job) or whatever ``fn`` raised.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ImagePoolBusy("image pool is saturated")
+        try:
+            future = self._submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _submit(self, fn: Callable[..., Any], *args: Any):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+            try:
+                return self._executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # a worker died (e.g. killed on OOM); start a fresh pool once
+                logger.warning("image pool broken, restarting workers")
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._new_executor()
+                try:
+                    return self._executor.submit(fn, *args)
+                except (BrokenProcessPool, RuntimeError) as exc:
+                    raise ImagePoolUnavailable("image pool failed to restart") from exc
+            except RuntimeError as exc:
+                # submit after shutdown
+                raise ImagePoolUnavailable("image pool is shut down") from exc
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+_settings = get_settings()
+image_pool = ImagePool(
+    workers=_settings.image_workers,
+    queue_limit=_settings.image_queue_limit,
+    timeout=_settings.image_job_timeout,
+)
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import hashlib
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from api.app.models import MediaObject
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def find_media(db: Session, digest: str, params: str) -> MediaObject | None:
+    """The stored object for these uploaded bytes processed with ``params``, if any."""
+    return db.get(MediaObject, (digest, params))
+
+
+def remember_media(db: Session, obj: MediaObject) -> None:
+    """Record an uploaded object and commit.
+
+    Keys are content-addressed, so two concurrent uploads of the same bytes
+    wrote the same S3 object; whichever row lands first is kept.
+    """
+    values = {c.key: getattr(obj, c.key) for c in MediaObject.__table__.columns if getattr(obj, c.key) is not None}
+    stmt = pg_insert(MediaObject.__table__).values(**values)
+    db.execute(stmt.on_conflict_do_nothing(index_elements=["content_hash", "params"]))
+    db.commit()
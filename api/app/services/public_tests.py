@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import uuid
+from dataclasses import dataclass
+
+from api.app.core.cache import LRUCache
+from api.app.core.config import get_settings
+from api.app.models import Test
+from api.app.schemas import TestRead
+
+
+@dataclass(frozen=True)
+class CachedPublicTest:
+    version: int
+    body: bytes
+    etag: str
+    test_id: uuid.UUID
+    owner_username: str | None
+
+
+class PublicTestCache:
+    """Pre-serialized ``TestRead`` payloads for the public runner endpoint.
+
+    Every slug has a content version that is bumped by ``invalidate``. A reader
+    remembers the version before loading the test and ``store`` refuses to cache
+    the payload if the slug was invalidated in the meantime, so a slow reader
+    can't put stale content back after an update. The TTL bounds staleness
+    across worker processes, which don't see each other's invalidations.
+
+    Versions are drawn from one counter and live as long as a cache entry
+    (bounded by ``maxsize`` too), which is far longer than any load takes; a
+    forgotten version reads as 0 and is never handed out again.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None):
+        self._entries = LRUCache(maxsize, ttl=ttl)
+        self._versions = LRUCache(maxsize, ttl=ttl)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def version(self, slug: str) -> int:
+        return self._versions.get(slug, 0)
+
+    def get(self, slug: str) -> CachedPublicTest | None:
+        entry: CachedPublicTest | None = self._entries.get(slug)
+        if entry is None or entry.version != self.version(slug):
+            return None
+        return entry
+
+    def store(self, slug: str, version: int, test: Test) -> CachedPublicTest:
+        body = TestRead.from_orm(test).json().encode("utf-8")
+        entry = CachedPublicTest(
+            version=version,
+            body=body,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            test_id=test.id,
+            owner_username=test.created_by_username,
+        )
+        with self._lock:
+            if version == self.version(slug):
+                self._entries.set(slug, entry)
+        return entry
+
+    def invalidate(self, slug: str) -> None:
+        with self._lock:
+            self._generation += 1
+            self._versions.set(slug, self._generation)
+            self._entries.pop(slug)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+_settings = get_settings()
+public_test_cache = PublicTestCache(_settings.public_test_cache_size, ttl=_settings.public_test_cache_ttl or None)
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from api.app.core.config import get_settings
+from api.app.db.session import SessionLocal
+from api.app.models import Test, TestRunLog
+from api.app.services.activity import record_activity
+
+logger = logging.getLogger("run_log_buffer")
+
+
+class RunLogBuffer:
+    """Write-behind buffer for ``test_run_logs`` rows.
+
+    ``submit`` only enqueues (never blocks the request); a daemon thread
+    flushes the queue with one multi-row INSERT once ``batch_size`` records
+    are waiting or ``flush_interval`` seconds have passed. When the queue is
+    full new records are dropped and counted. ``stop`` closes the buffer and
+    waits for the thread to drain what is left; records submitted after that
+    are dropped until ``start`` reopens it.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        batch_size: int,
+        flush_interval: float,
+        max_queue: int,
+    ):
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue[dict[str, Any]] = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_at: datetime | None = None
+
+    def start(self) -> None:
+        with self._lock:
+            self._closed = False
+            self._start_locked()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            # no submit can enqueue past this point, so the thread's final drain sees everything
+            self._closed = True
+            self._stop.set()
+            thread = self._thread
+        if thread is None:
+            self._drain()
+            return
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("run log buffer still flushing after %.1fs, %d records queued", timeout, self._queue.qsize())
+            return
+        with self._lock:
+            if self._thread is thread:
+                self._thread = None
+
+    def submit(self, **fields: Any) -> bool:
+        record = {"id": uuid.uuid4(), "created_at": datetime.now(timezone.utc), **fields}
+        with self._lock:
+            if self._closed:
+                self.dropped += 1
+                return False
+            if self._thread is None:
+                self._start_locked()
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+                return False
+            self.enqueued += 1
+        return True
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_flush_at": self.last_flush_at,
+        }
+
+    def _start_locked(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="run-log-buffer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+        self._drain()
+
+    def _collect(self) -> list[dict[str, Any]]:
+        batch: list[dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self) -> None:
+        while True:
+            batch: list[dict[str, Any]] = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._flush(batch)
+
+    def _flush(self, batch: list[dict[str, Any]]) -> None:
+        try:
+            with self._session_factory() as db:
+                try:
+                    db.execute(insert(TestRunLog.__table__), batch)
+                    db.commit()
+                except IntegrityError:
+                    # a test was deleted after its record was queued; keep the rows, drop the link
+                    db.rollback()
+                    test_ids = {r["test_id"] for r in batch if r.get("test_id")}
+                    alive = set(db.scalars(select(Test.id).where(Test.id.in_(test_ids))))
+                    for record in batch:
+                        if record.get("test_id") not in alive:
+                            record["test_id"] = None
+                    db.execute(insert(TestRunLog.__table__), batch)
+                    db.commit()
+        except Exception:
+            with self._lock:
+                self.failed += len(batch)
+            logger.exception("run log flush failed, dropped %d records", len(batch))
+            return
+        record_activity("run_log", [r.get("test_id") for r in batch])
+        with self._lock:
+            self.flushed += len(batch)
+            self.batches += 1
+            self.last_flush_at = datetime.now(timezone.utc)
+
+
+_settings = get_settings()
+run_log_buffer = RunLogBuffer(
+    SessionLocal,
+    batch_size=_settings.run_log_batch_size,
+    flush_interval=_settings.run_log_flush_interval,
+    max_queue=_settings.run_log_queue_size,
+)
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import Date, DateTime, String, delete, func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from api.app.core.config import get_settings
+from api.app.models import StatsDaily, StatsDailySketch, StatsDailyUser, Test, TestRunLog
+from api.app.utils.hll import HyperLogLog
+
+logger = logging.getLogger("stats_rollup")
+
+# user-set kinds stored in stats_daily_users
+CREATED = "created"
+OPENED = "opened"  # open or complete, as in /stats
+COMPLETED = "completed"
+
+# late writes (run-log buffer, slow requests) may still land shortly after midnight
+SEAL_GRACE = timedelta(hours=1)
+
+SKETCH_ERROR = HyperLogLog().error
+
+
+def day_range(day: date) -> tuple[datetime, datetime]:
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def rebuild_day(db: Session, day: date, *, seal: bool) -> None:
+    """Recompute counters and distinct-user sets of one UTC day from raw rows."""
+    start, end = day_range(day)
+    created = db.scalar(
+        select(func.count(Test.id)).where(Test.created_at >= start, Test.created_at < end)
+    )
+    opened, completed = db.execute(
+        select(
+            func.count(TestRunLog.id).filter(TestRunLog.event_type == "open"),
+            func.count(TestRunLog.id).filter(TestRunLog.event_type == "complete"),
+        ).where(TestRunLog.created_at >= start, TestRunLog.created_at < end)
+    ).one()
+
+    db.execute(delete(StatsDailyUser).where(StatsDailyUser.day == day))
+    db.execute(delete(StatsDailySketch).where(StatsDailySketch.day == day))
+    in_day = (TestRunLog.created_at >= start, TestRunLog.created_at < end)
+    user_sets = (
+        (CREATED, Test.created_by, (Test.created_at >= start, Test.created_at < end)),
+        (OPENED, TestRunLog.user_id, (TestRunLog.event_type.in_(["open", "complete"]), *in_day)),
+        (COMPLETED, TestRunLog.user_id, (TestRunLog.event_type == "complete", *in_day)),
+    )
+    for kind, user_column, conditions in user_sets:
+        users = select(literal(day, Date), literal(kind, String), user_column).where(*conditions).distinct()
+        db.execute(insert(StatsDailyUser).from_select(["day", "kind", "user_id"], users))
+        sketch = HyperLogLog().update(
+            db.scalars(select(StatsDailyUser.user_id).where(StatsDailyUser.day == day, StatsDailyUser.kind == kind))
+        )
+        db.add(StatsDailySketch(day=day, kind=kind, registers=sketch.to_bytes()))
+
+    db.execute(delete(StatsDaily).where(StatsDaily.day == day))
+    db.add(
+        StatsDaily(
+            day=day,
+            tests_created=created or 0,
+            tests_opened=opened or 0,
+            tests_completed=completed or 0,
+            sealed=seal,
+            updated_at=datetime.now(timezone.utc),
+        )
+    )
+    db.flush()
+
+
+def refresh_rollups(db: Session, *, now: datetime | None = None) -> None:
+    """Bring rollups up to date: seal finished days, recompute the open ones.
+
+    Sealed days are never touched again. Open days (today, and yesterday
+    during the grace period) are recomputed at most every
+    ``stats_refresh_interval`` seconds. Catch-up is limited to
+    ``stats_catchup_days``; older history is built by ``api.scripts.backfill_stats``.
+    """
+    settings = get_settings()
+    now = now or datetime.now(timezone.utc)
+    today = now.date()
+    last_sealed = db.scalar(select(func.max(StatsDaily.day)).where(StatsDaily.sealed.is_(True)))
+    first = today - timedelta(days=settings.stats_catchup_days)
+    if last_sealed is not None and last_sealed + timedelta(days=1) > first:
+        first = last_sealed + timedelta(days=1)
+
+    fresh_after = now - timedelta(seconds=settings.stats_refresh_interval)
+    fresh = set(
+        db.scalars(
+            select(StatsDaily.day).where(
+                StatsDaily.day >= first, StatsDaily.day <= today, StatsDaily.updated_at >= fresh_after
+            )
+        )
+    )
+    try:
+        day = first
+        while day <= today:
+            seal = day_range(day)[1] + SEAL_GRACE <= now
+            if seal or day not in fresh:
+                rebuild_day(db, day, seal=seal)
+            day += timedelta(days=1)
+        db.commit()
+    except IntegrityError:
+        # another worker rebuilt the same day concurrently; its rows are as good as ours
+        db.rollback()
+        logger.info("stats rollup refresh raced with another worker, skipped")
+
+
+def unique_users(db: Session, first: date, last: date, *, exact: bool = False) -> dict[str, int]:
+    """Distinct users per kind over days ``[first, last)``.
+
+    By default merges the per-day HyperLogLog sketches (constant work per
+    day, ``SKETCH_ERROR`` relative standard error); ``exact`` counts the
+    stored user sets instead.
+    """
+    if exact:
+        rows = db.execute(
+            select(StatsDailyUser.kind, func.count(func.distinct(StatsDailyUser.user_id)))
+            .where(StatsDailyUser.day >= first, StatsDailyUser.day < last)
+            .group_by(StatsDailyUser.kind)
+        )
+        return dict(rows.all())
+
+    merged: dict[str, HyperLogLog] = {}
+    rows = db.execute(
+        select(StatsDailySketch.kind, StatsDailySketch.registers).where(
+            StatsDailySketch.day >= first, StatsDailySketch.day < last
+        )
+    )
+    for kind, registers in rows:
+        sketch = HyperLogLog.from_bytes(registers)
+        if kind in merged:
+            merged[kind].merge(sketch)
+        else:
+            merged[kind] = sketch
+    return {kind: sketch.count() for kind, sketch in merged.items()}
+
+
+def _bucket_row(start: datetime) -> dict:
+    return {
+        "start": start,
+        "tests_created": 0,
+        "tests_opened": 0,
+        "tests_completed": 0,
+        "created_users": 0,
+        "opened_users": 0,
+        "completed_users": 0,
+    }
+
+
+def rollup_series(db: Session, first: date, last: date, *, week: bool = False) -> list[dict]:
+    """Per-day (or per ISO week) counters and sketch uniques for ``[first, last]``.
+
+    Two queries regardless of range length: one over ``stats_daily`` and one
+    over ``stats_daily_sketches``. Weeks start on Monday; the first and last
+    week only include days inside the range.
+    """
+
+    def bucket_of(day: date) -> date:
+        return day - timedelta(days=day.weekday()) if week else day
+
+    buckets: dict[date, dict] = {}
+    day = first
+    while day <= last:
+        key = bucket_of(day)
+        if key not in buckets:
+            buckets[key] = _bucket_row(day_range(key)[0])
+        day += timedelta(days=1)
+
+    for row in db.scalars(select(StatsDaily).where(StatsDaily.day >= first, StatsDaily.day <= last)):
+        bucket = buckets[bucket_of(row.day)]
+        bucket["tests_created"] += row.tests_created
+        bucket["tests_opened"] += row.tests_opened
+        bucket["tests_completed"] += row.tests_completed
+
+    sketches: dict[tuple[date, str], HyperLogLog] = {}
+    rows = db.execute(
+        select(StatsDailySketch.day, StatsDailySketch.kind, StatsDailySketch.registers).where(
+            StatsDailySketch.day >= first, StatsDailySketch.day <= last
+        )
+    )
+    for day, kind, registers in rows:
+        key = (bucket_of(day), kind)
+        sketch = HyperLogLog.from_bytes(registers)
+        if key in sketches:
+            sketches[key].merge(sketch)
+        else:
+            sketches[key] = sketch
+    for (key, kind), sketch in sketches.items():
+        buckets[key][f"{kind}_users"] = sketch.count()
+
+    for bucket in buckets.values():
+        bucket["tests_opened"] = max(bucket["tests_opened"], bucket["tests_completed"])
+    return list(buckets.values())
+
+
+def hourly_series(db: Session, first: date, last: date) -> list[dict]:
+    """Per-hour counters and exact uniques for ``[first, last]`` straight from raw rows.
+
+    One grouped query per source table; meant for short ranges only.
+    """
+    start, end = day_range(first)[0], day_range(last)[1]
+    buckets: dict[datetime, dict] = {}
+    hour = start
+    while hour < end:
+        buckets[hour] = _bucket_row(hour)
+        hour += timedelta(hours=1)
+
+    def bucket_of(value: datetime) -> dict:
+        return buckets[value.replace(tzinfo=timezone.utc)]
+
+    # truncate in UTC regardless of the session time zone
+    created_hour = func.date_trunc("hour", func.timezone("UTC", Test.created_at), type_=DateTime())
+    rows = db.execute(
+        select(created_hour, func.count(Test.id), func.count(func.distinct(Test.created_by)))
+        .where(Test.created_at >= start, Test.created_at < end)
+        .group_by(created_hour)
+    )
+    for value, created, users in rows:
+        bucket = bucket_of(value)
+        bucket["tests_created"] = created
+        bucket["created_users"] = users
+
+    log_hour = func.date_trunc("hour", func.timezone("UTC", TestRunLog.created_at), type_=DateTime())
+    is_complete = TestRunLog.event_type == "complete"
+    is_opened = TestRunLog.event_type.in_(["open", "complete"])
+    rows = db.execute(
+        select(
+            log_hour,
+            func.count(TestRunLog.id).filter(TestRunLog.event_type == "open"),
+            func.count(TestRunLog.id).filter(is_complete),
+            func.count(func.distinct(TestRunLog.user_id)).filter(is_opened),
+            func.count(func.distinct(TestRunLog.user_id)).filter(is_complete),
+        )
+        .where(TestRunLog.created_at >= start, TestRunLog.created_at < end)
+        .group_by(log_hour)
+    )
+    for value, opened, completed, opened_users, completed_users in rows:
+        bucket = bucket_of(value)
+        bucket["tests_opened"] = max(opened, completed)
+        bucket["tests_completed"] = completed
+        bucket["opened_users"] = opened_users
+        bucket["completed_users"] = completed_users
+    return list(buckets.values())
@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 import os
-import time
 import hashlib
 import boto3
 from botocore.config import Config
@@ -24,13 +23,20 @@ s3 = boto3.client(
 )
 
 def _make_key(data: bytes, ext: str) -> str:
-    h = hashlib.sha256(data).hexdigest()[:16]
-    ts = int(time.time())
-    return f"cards/{h}_{ts}.{ext}"
+    # content-addressed: identical output always maps to the same object
+    h = hashlib.sha256(data).hexdigest()[:32]
+    return f"cards/{h}.{ext}"
 
-def upload_bytes(data: bytes, content_type: str) -> str:
-    ext = "webp" if content_type == "image/webp" else "jpg"
-    key = _make_key(data, ext)
+def make_key(data: bytes, content_type: str) -> str:
+    return _make_key(data, "webp" if content_type == "image/webp" else "jpg")
+
+def variant_key(key: str, width: int) -> str:
+    """Key of a responsive variant stored next to ``key``: ``cards/<h>_<width>w.<ext>``."""
+    stem, _, ext = key.rpartition(".")
+    return f"{stem}_{width}w.{ext}"
+
+def upload_bytes(data: bytes, content_type: str, *, key: str | None = None) -> str:
+    key = key or make_key(data, content_type)
     s3.put_object(
         Bucket=S3_BUCKET,
         Key=key,
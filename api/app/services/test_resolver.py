@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from api.app.core.cache import LRUCache
+from api.app.core.config import get_settings
+from api.app.models import Test
+
+
+@dataclass(frozen=True)
+class TestMeta:
+    """What the telemetry/response endpoints need to know about a test."""
+
+    id: uuid.UUID
+    slug: str
+    created_by: int
+    created_by_username: str | None
+    is_public: bool
+    lead_enabled: bool
+    lead_collect_name: bool
+    lead_collect_phone: bool
+    lead_collect_email: bool
+    lead_collect_site: bool
+
+
+_COLUMNS = (
+    Test.id,
+    Test.slug,
+    Test.created_by,
+    Test.created_by_username,
+    Test.is_public,
+    Test.lead_enabled,
+    Test.lead_collect_name,
+    Test.lead_collect_phone,
+    Test.lead_collect_email,
+    Test.lead_collect_site,
+)
+
+
+class TestResolver:
+    """Cached slug/id -> ``TestMeta`` lookups with TTL and explicit invalidation.
+
+    Misses are not cached, so a freshly created test resolves immediately.
+    Every ``invalidate`` bumps a generation; a load that started before the
+    bump does not cache its row, so a reader racing an update or delete
+    can't put the old meta back for a full TTL. Other workers still hold
+    their copy until it expires.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None):
+        self._by_slug = LRUCache(maxsize, ttl=ttl)
+        self._by_id = LRUCache(maxsize, ttl=ttl)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def by_slug(self, db: Session, slug: str) -> TestMeta | None:
+        meta = self._by_slug.get(slug)
+        if meta is None:
+            meta = self._load(db, Test.slug == slug)
+        return meta
+
+    def by_id(self, db: Session, test_id: uuid.UUID) -> TestMeta | None:
+        meta = self._by_id.get(test_id)
+        if meta is None:
+            meta = self._load(db, Test.id == test_id)
+        return meta
+
+    def invalidate(self, *, slug: str | None = None, test_id: uuid.UUID | None = None) -> None:
+        with self._lock:
+            self._generation += 1
+            self._invalidate(slug, test_id)
+
+    def _invalidate(self, slug: str | None, test_id: uuid.UUID | None) -> None:
+        if slug is not None:
+            meta = self._by_slug.pop(slug)
+            if meta is not None:
+                self._by_id.pop(meta.id)
+        if test_id is not None:
+            meta = self._by_id.pop(test_id)
+            if meta is not None:
+                self._by_slug.pop(meta.slug)
+
+    def clear(self) -> None:
+        self._by_slug.clear()
+        self._by_id.clear()
+
+    def _load(self, db: Session, condition) -> TestMeta | None:
+        generation = self._generation
+        row = db.execute(select(*_COLUMNS).where(condition)).first()
+        if row is None:
+            return None
+        meta = TestMeta(**row._asdict())
+        with self._lock:
+            if generation == self._generation:
+                self._by_slug.set(meta.slug, meta)
+                self._by_id.set(meta.id, meta)
+        return meta
+
+
+_settings = get_settings()
+test_resolver = TestResolver(_settings.test_resolver_cache_size, ttl=_settings.test_resolver_ttl or None)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import Hashable, Iterable
+
+# 2**12 one-byte registers: 4 KiB per sketch, ~1.6% standard error
+DEFAULT_PRECISION = 12
+
+
+def _hash64(value: Hashable) -> int:
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with mergeable, byte-serializable registers.
+
+    Sketches of the same precision merge by taking the register-wise maximum,
+    so per-day sketches combine into any range without touching raw rows.
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: bytes | None = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is None:
+            self.registers = bytearray(self.m)
+        elif len(registers) != self.m:
+            raise ValueError(f"expected {self.m} registers, got {len(registers)}")
+        else:
+            self.registers = bytearray(registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(int(math.log2(len(data))), data)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+    @property
+    def error(self) -> float:
+        """Relative standard error of ``count``."""
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value: Hashable) -> None:
+        h = _hash64(value)
+        bits = 64 - self.precision
+        index = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[Hashable]) -> "HyperLogLog":
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
@@ -1,7 +1,11 @@
 from __future__ import annotations
+import base64
+import math
 import os
+from dataclasses import dataclass
 from io import BytesIO
-from PIL import Image, ImageOps
+from typing import Iterable
+from PIL import ExifTags, Image, ImageOps
 
 # === Tunables from env ===
 MAX_W = int(os.getenv("CARD_IMAGE_MAX_WIDTH", "610"))
@@ -12,6 +16,21 @@ STRIP_EXIF = os.getenv("CARD_STRIP_EXIF", "true").lower() == "true"
 # fixed aspect ratio (W:H). We want vertical 610:1000 by default.
 TARGET_ASPECT_W = int(os.getenv("CARD_ASPECT_W", "610"))
 TARGET_ASPECT_H = int(os.getenv("CARD_ASPECT_H", "1000"))
+# responsive variant widths; MAX_W is always produced, wider ones only when
+# the source is large enough (no upscaling)
+WIDTHS = tuple(int(w) for w in os.getenv("CARD_IMAGE_WIDTHS", "305,610,1220").split(",") if w.strip())
+# Pillow's resize ``reducing_gap``: shrink with the cheap integer ``reduce()``
+# until the image is at most this many times the target, then LANCZOS the rest
+REDUCING_GAP = float(os.getenv("CARD_IMAGE_REDUCING_GAP", "3.0"))
+# inline placeholder (LQIP) shown while the real image loads
+PLACEHOLDER_WIDTH = int(os.getenv("CARD_PLACEHOLDER_WIDTH", "16"))
+PLACEHOLDER_QUALITY = int(os.getenv("CARD_PLACEHOLDER_QUALITY", "40"))
+# everything that shapes compress_variants' output for a given input; part of
+# the media_objects dedup key, so changing a tunable reprocesses uploads
+PROCESSING_PARAMS = (
+    f"card:{FORMAT}:{MAX_W}x{MAX_H}:{TARGET_ASPECT_W}/{TARGET_ASPECT_H}:q{QUALITY}:exif{int(STRIP_EXIF)}"
+    f":w{','.join(map(str, sorted(WIDTHS)))}:gap{REDUCING_GAP}:ph{PLACEHOLDER_WIDTH}q{PLACEHOLDER_QUALITY}"
+)
 
 CONTENT_TYPES = {
     "WEBP": "image/webp",
@@ -33,72 +52,149 @@ def _normalize_mode(img: Image.Image) -> Image.Image:
         return img.convert("RGBA" if "A" in img.getbands() else "RGB")
     return img
 
-def _center_crop_aspect(img: Image.Image, target_aspect: float) -> Image.Image:
-    """Crop the image to the target aspect ratio keeping the center."""
-    w, h = img.size
+
+def _center_crop_box(size: tuple[int, int], target_aspect: float) -> tuple[float, float, float, float]:
+    """The centered region of ``size`` with the target aspect ratio, as a resize ``box``."""
+    w, h = size
     current = w / h
     if abs(current - target_aspect) < 1e-3:
-        return img  # already close enough
+        return (0, 0, w, h)  # already close enough
 
     if current > target_aspect:
         # too wide -> cut left/right
-        new_w = int(h * target_aspect)
-        x0 = (w - new_w) // 2
-        return img.crop((x0, 0, x0 + new_w, h))
-    else:
-        # too tall -> cut top/bottom
-        new_h = int(w / target_aspect)
-        y0 = (h - new_h) // 2
-        return img.crop((0, y0, w, y0 + new_h))
-
-def _resize_by_shorter_side(img: Image.Image, target_w: int, target_h: int) -> Image.Image:
-    """
-    Scale image so that the *shorter* side matches the corresponding target side,
-    without upscaling above original size. This ensures we don't lose detail before crop.
-    """
-    w, h = img.size
-    scale = min(target_w / w, target_h / h)
-    if scale < 1.0:
-        new_size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
-        return img.resize(new_size, Image.Resampling.LANCZOS)
-    return img  # don't upscale
+        new_w = h * target_aspect
+        x0 = (w - new_w) / 2
+        return (x0, 0, x0 + new_w, h)
+    # too tall -> cut top/bottom
+    new_h = w / target_aspect
+    y0 = (h - new_h) / 2
+    return (0, y0, w, y0 + new_h)
 
-def compress_image(src_bytes: bytes) -> tuple[bytes, str]:
+
+@dataclass(frozen=True)
+class ImageVariant:
+    width: int
+    height: int
+    data: bytes
+    content_type: str
+
+
+@dataclass(frozen=True)
+class ImageMeta:
+    """What the runner needs before the image arrives: box size, background colour, blurred preview."""
+
+    width: int
+    height: int
+    color: str  # "#rrggbb"
+    placeholder: str  # data: URI
+
+
+def _describe(im: Image.Image, width: int, height: int) -> ImageMeta:
+    """Dominant colour and a PLACEHOLDER_WIDTH px wide inline placeholder of ``im``."""
+    tiny = im.resize(
+        (PLACEHOLDER_WIDTH, max(1, round(PLACEHOLDER_WIDTH * im.height / im.width))),
+        Image.Resampling.BOX,
+        reducing_gap=REDUCING_GAP,
+    )
+    rgb = tiny.convert("RGB")
+    # most frequent colour of a small quantization: the dominant one, not the muddy average
+    paletted = rgb.quantize(4)
+    _, index = max(paletted.getcolors())
+    r, g, b = paletted.getpalette()[index * 3 : index * 3 + 3]
+
+    fmt = "JPEG" if FORMAT in ("JPEG", "JPG") else "WEBP"
+    out = BytesIO()
+    (rgb if fmt == "JPEG" else tiny).save(out, fmt, quality=PLACEHOLDER_QUALITY)
+    placeholder = f"data:{CONTENT_TYPES[fmt]};base64,{base64.b64encode(out.getvalue()).decode('ascii')}"
+    return ImageMeta(width=width, height=height, color=f"#{r:02x}{g:02x}{b:02x}", placeholder=placeholder)
+
+
+def _height(width: int) -> int:
+    return max(1, round(width * MAX_H / MAX_W))
+
+
+def _is_final(im: Image.Image) -> bool:
+    """Already in the output format and size, with nothing to strip: the input can be stored as is."""
+    fmt = "JPEG" if FORMAT == "JPG" else FORMAT
+    if im.format != fmt or im.size != (MAX_W, MAX_H):
+        return False
+    return not (STRIP_EXIF and ("exif" in im.info or "icc_profile" in im.info))
+
+
+def _encode(im: Image.Image) -> bytes:
+    out = BytesIO()
+    save_kwargs = {}
+    if FORMAT in ("JPEG", "JPG"):
+        save_kwargs.update(optimize=True, quality=QUALITY, progressive=True)
+    elif FORMAT == "WEBP":
+        save_kwargs.update(quality=QUALITY, method=6, lossless=False)
+    im.save(out, FORMAT, **save_kwargs)
+    return out.getvalue()
+
+
+def compress_variants(
+    src_bytes: bytes, widths: Iterable[int] | None = None
+) -> tuple[list[ImageVariant], ImageMeta]:
     """
-    Pipeline:
-    1) Downscale by the *shorter* side to fit MAX_W x MAX_H
-    2) Center-crop to fixed aspect (default 610:1000 vertical)
-    3) Ensure exact final dimensions (MAX_W x MAX_H)
-    4) Strip metadata and save as WEBP/JPEG with quality settings.
-    Returns (optimized_bytes, content_type).
+    Pipeline (one decode for all widths):
+    1) Center-crop box for the fixed aspect (default 610:1000 vertical) on the
+       original size; widths the crop cannot fill are dropped, MAX_W is kept
+    2) JPEG is decoded at the smallest 1/2, 1/4 or 1/8 scale (``draft``)
+       that still covers the widest variant
+    3) Crop and resize to the widest variant in one step (``reduce()`` then
+       LANCZOS on the cropped region only); each narrower variant is resized
+       from the previous one
+    4) Strip metadata and save as WEBP/JPEG with quality settings. An input
+       already in the target format at MAX_W x MAX_H is kept as that variant.
+    5) Dominant colour and placeholder from the narrowest variant.
+    Returns (variants ordered by width, metadata of the MAX_W image).
     """
+    content_type = CONTENT_TYPES.get(FORMAT, "application/octet-stream")
     with Image.open(BytesIO(src_bytes)) as im:
+        target_aspect = TARGET_ASPECT_W / TARGET_ASPECT_H
+        x0, y0, x1, y1 = _center_crop_box(im.size, target_aspect)
+        widths = sorted({w for w in (widths or WIDTHS) if w <= x1 - x0} | {MAX_W}, reverse=True)
+        final = _is_final(im)
+
+        # full-image size at which the crop region still covers the widest variant
+        w, h = im.size
+        widest = widths[0]
+        drafted = im.draft(None, (math.ceil(w * widest / (x1 - x0)), math.ceil(h * _height(widest) / (y1 - y0))))
         im.load()
         if STRIP_EXIF:
             im.info.pop("icc_profile", None)
             im.info.pop("exif", None)
 
-        im = _normalize_mode(im)
+        # draft returns the decoded extent in original coordinates; map the crop box onto it
+        scale = drafted[1][2] / w if drafted else 1.0
+        box = (x0 * scale, y0 * scale, x1 * scale, y1 * scale)
 
-        # 1) downscale by shorter side first (no upscaling)
-        im = _resize_by_shorter_side(im, MAX_W, MAX_H)
+        frame = _normalize_mode(im).resize(
+            (widest, _height(widest)), Image.Resampling.LANCZOS, box=box, reducing_gap=REDUCING_GAP
+        )
+        variants = []
+        for width in widths:
+            if frame.width != width:
+                frame = frame.resize((width, _height(width)), Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+            data = src_bytes if final and width == MAX_W else _encode(frame)
+            variants.append(ImageVariant(width, frame.height, data, content_type))
+        meta = _describe(frame, MAX_W, MAX_H)
+    return variants[::-1], meta
 
-        # 2) crop to target aspect (vertical 610:1000 by default)
-        target_aspect = TARGET_ASPECT_W / TARGET_ASPECT_H
-        im = _center_crop_aspect(im, target_aspect)
-
-        # 3) final resize to exact target dimensions (if still off by a few px)
-        if im.size != (MAX_W, MAX_H):
-            im = im.resize((MAX_W, MAX_H), Image.Resampling.LANCZOS)
-
-        # 4) save optimized
-        out = BytesIO()
-        save_kwargs = {}
-        if FORMAT in ("JPEG", "JPG"):
-            save_kwargs.update(optimize=True, quality=QUALITY, progressive=True)
-        elif FORMAT == "WEBP":
-            save_kwargs.update(quality=QUALITY, method=6, lossless=False)
-
-        im.save(out, FORMAT, **save_kwargs)
-        out.seek(0)
-        return out.read(), CONTENT_TYPES.get(FORMAT, "application/octet-stream")
\ No newline at end of file
+
+def compress_image(src_bytes: bytes) -> tuple[bytes, str]:
+    """The single MAX_W x MAX_H image (see ``compress_variants``). Returns (optimized_bytes, content_type)."""
+    variants, _ = compress_variants(src_bytes, (MAX_W,))
+    return variants[0].data, variants[0].content_type
+
+
+def describe_image(src_bytes: bytes) -> ImageMeta:
+    """Metadata of an image stored as uploaded: display size (EXIF orientation applied),
+    dominant colour and placeholder. JPEG is decoded at 1/8 scale when large enough."""
+    with Image.open(BytesIO(src_bytes)) as im:
+        width, height = im.size
+        if im.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+            width, height = height, width
+        im.draft(None, (PLACEHOLDER_WIDTH * 4, PLACEHOLDER_WIDTH * 4))
+        im.load()
+        return _describe(_normalize_mode(ImageOps.exif_transpose(im)), width, height)
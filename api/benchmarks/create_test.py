@@ -0,0 +1,114 @@
+"""Insert latency of ``crud.tests.create_test`` against question count.
+
+    python -m api.benchmarks.create_test [--database-url URL] [--repeat N]
+
+Without ``--database-url`` (or ``DATABASE_URL``) runs against in-memory SQLite,
+which only shows statement counts; point it at Postgres for real latencies.
+Every run is rolled back. The ``per-row`` column replays the previous
+implementation that flushed after every result and question.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from api.app.crud.tests import create_test
+from api.app.db.session import Base
+from api.app.models import Answer, Question, Result, Test
+from api.app.schemas import TestCreate
+
+QUESTION_COUNTS = (1, 5, 10, 30, 60)
+ANSWERS_PER_QUESTION = 4
+
+
+def _payload(questions: int) -> TestCreate:
+    return TestCreate(
+        title=f"bench {questions}",
+        slug=f"bench-{questions}",
+        type="multi",
+        results=[{"title": f"result {i}", "description": "d"} for i in range(ANSWERS_PER_QUESTION)],
+        questions=[
+            {
+                "order_num": q + 1,
+                "text": f"question {q}",
+                "answers": [{"order_num": a + 1, "text": f"answer {a}", "weight": a} for a in range(ANSWERS_PER_QUESTION)],
+            }
+            for q in range(questions)
+        ],
+    )
+
+
+def _create_per_row(db: Session, payload: TestCreate, *, created_by: int) -> Test:
+    data = payload.dict()
+    test = Test(
+        slug=data["slug"],
+        title=data["title"],
+        type=data["type"].value,
+        created_by=created_by,
+    )
+    db.add(test)
+    for idx, result in enumerate(data["results"]):
+        result.pop("id", None)
+        result["order_num"] = result.get("order_num") or idx + 1
+        db.add(Result(test=test, **result))
+        db.flush()
+    for question in data["questions"]:
+        answers = question.pop("answers", [])
+        question.pop("id", None)
+        question_obj = Question(test=test, **question)
+        db.add(question_obj)
+        db.flush()
+        for answer in answers:
+            answer.pop("id", None)
+            db.add(Answer(test=test, question=question_obj, **answer))
+    db.flush()
+    db.refresh(test)
+    return test
+
+
+def _measure(engine, fn, questions: int, repeat: int) -> tuple[float, int]:
+    statements = 0
+
+    def count(*_args, **_kwargs):
+        nonlocal statements
+        statements += 1
+
+    timings = []
+    for _ in range(repeat):
+        statements = 0
+        event.listen(engine, "before_cursor_execute", count)
+        with Session(engine) as db:
+            started = time.perf_counter()
+            fn(db, _payload(questions), created_by=1)
+            timings.append((time.perf_counter() - started) * 1000)
+            db.rollback()
+        event.remove(engine, "before_cursor_execute", count)
+    return statistics.median(timings), statements
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL") or "sqlite://")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url, future=True)
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(engine, tables=[Test.__table__, Question.__table__, Result.__table__, Answer.__table__])
+
+    print(f"{engine.dialect.name}, {ANSWERS_PER_QUESTION} answers/question, median of {args.repeat}")
+    print(f"{'questions':>9} | {'bulk ms':>8} {'stmts':>5} | {'per-row ms':>10} {'stmts':>5}")
+    for questions in QUESTION_COUNTS:
+        bulk_ms, bulk_stmts = _measure(engine, create_test, questions, args.repeat)
+        row_ms, row_stmts = _measure(engine, _create_per_row, questions, args.repeat)
+        print(f"{questions:>9} | {bulk_ms:>8.2f} {bulk_stmts:>5} | {row_ms:>10.2f} {row_stmts:>5}")
+
+
+if __name__ == "__main__":
+    main()
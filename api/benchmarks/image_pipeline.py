@@ -0,0 +1,142 @@
+"""CPU time and peak RSS of ``utils.image_processing.compress_image`` per input size.
+
+    python -m api.benchmarks.image_pipeline [--repeat N] [IMAGE ...]
+
+Without arguments, synthetic phone-sized JPEGs (12, 24 and 50 MP) are
+generated. Every (pipeline, image) pair runs in a fresh process so its peak
+RSS is not inflated by earlier runs; ``base`` is the RSS after imports and
+reading the input. The ``full-decode`` columns replay the previous
+implementation: decode at native resolution, downscale, crop, resize again.
+That path upscaled a small crop back to the target, so its output is
+blurrier and cheaper to encode; ``KiB`` is the encoded size.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import resource
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageFilter
+
+from api.app.utils import image_processing as ip
+from api.app.utils.image_processing import compress_image
+
+SYNTHETIC_SIZES = ((4032, 3024), (5664, 4248), (8160, 6120))
+
+
+def _full_decode_compress(src_bytes: bytes) -> tuple[bytes, str]:
+    with Image.open(BytesIO(src_bytes)) as im:
+        im.load()
+        if ip.STRIP_EXIF:
+            im.info.pop("icc_profile", None)
+            im.info.pop("exif", None)
+        im = ip._normalize_mode(im)
+
+        w, h = im.size
+        scale = min(ip.MAX_W / w, ip.MAX_H / h)
+        if scale < 1.0:
+            im = im.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.Resampling.LANCZOS)
+
+        target_aspect = ip.TARGET_ASPECT_W / ip.TARGET_ASPECT_H
+        w, h = im.size
+        if abs(w / h - target_aspect) >= 1e-3:
+            if w / h > target_aspect:
+                new_w = int(h * target_aspect)
+                x0 = (w - new_w) // 2
+                im = im.crop((x0, 0, x0 + new_w, h))
+            else:
+                new_h = int(w / target_aspect)
+                y0 = (h - new_h) // 2
+                im = im.crop((0, y0, w, y0 + new_h))
+        if im.size != (ip.MAX_W, ip.MAX_H):
+            im = im.resize((ip.MAX_W, ip.MAX_H), Image.Resampling.LANCZOS)
+
+        out = BytesIO()
+        save_kwargs = {}
+        if ip.FORMAT in ("JPEG", "JPG"):
+            save_kwargs.update(optimize=True, quality=ip.QUALITY, progressive=True)
+        elif ip.FORMAT == "WEBP":
+            save_kwargs.update(quality=ip.QUALITY, method=6, lossless=False)
+        im.save(out, ip.FORMAT, **save_kwargs)
+        return out.getvalue(), ip.CONTENT_TYPES.get(ip.FORMAT, "application/octet-stream")
+
+
+PIPELINES = {"fast": compress_image, "full-decode": _full_decode_compress}
+
+
+def _synthetic_jpeg(size: tuple[int, int], path: str) -> None:
+    """A gradient with soft noise: compresses roughly like a photo, unlike a flat fill."""
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 64).filter(ImageFilter.BoxBlur(2))
+    im = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    im.save(path, "JPEG", quality=90)
+
+
+def _peak_rss_mib() -> int:
+    # VmHWM starts over at exec; ru_maxrss would carry the parent's peak into a spawned child
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+
+def _measure(pipeline: str, path: str, repeat: int) -> tuple[float, int, int, int]:
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    fn = PIPELINES[pipeline]
+    base = _peak_rss_mib()
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        out, _ = fn(raw)
+        timings.append((time.process_time() - started) * 1000)
+    return statistics.median(timings), _peak_rss_mib(), base, len(out) // 1024
+
+
+def _run_isolated(pipeline: str, path: str, repeat: int) -> tuple[float, int, int, int]:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_measure, pipeline, path, repeat).result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="image files; synthetic JPEGs when omitted")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        images = args.images
+        if not images:
+            images = []
+            for w, h in SYNTHETIC_SIZES:
+                path = os.path.join(tmp, f"synthetic-{w}x{h}.jpg")
+                _synthetic_jpeg((w, h), path)
+                images.append(path)
+
+        print(f"{ip.FORMAT} {ip.MAX_W}x{ip.MAX_H} q{ip.QUALITY}, CPU ms median of {args.repeat}, RSS in MiB")
+        columns = f"{'ms':>7} {'peak':>5} {'base':>5} {'KiB':>4}"
+        print(f"{'':>30} | {'fast':^24} | {'full-decode':^24}")
+        print(f"{'image':>24} {'MP':>5} | {columns} | {columns}")
+        for path in images:
+            with Image.open(path) as im:
+                megapixels = im.size[0] * im.size[1] / 1e6
+            row = f"{os.path.basename(path)[-24:]:>24} {megapixels:>5.1f}"
+            for pipeline in PIPELINES:
+                ms, peak, base, size = _run_isolated(pipeline, path, args.repeat)
+                row += f" | {ms:>7.1f} {peak:>5} {base:>5} {size:>4}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
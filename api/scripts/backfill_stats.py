@@ -0,0 +1,52 @@
+"""Build sealed ``stats_daily`` rollups for past days.
+
+    python -m api.scripts.backfill_stats [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+
+Defaults to the first day with data through yesterday (UTC). Already sealed
+days are rebuilt as well, so the command is safe to re-run after fixing data.
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from api.app.db.session import SessionLocal
+from api.app.models import Test, TestRunLog
+from api.app.services.stats_rollup import rebuild_day
+
+
+def _first_day(db) -> date | None:
+    candidates = [
+        db.scalar(select(func.min(Test.created_at))),
+        db.scalar(select(func.min(TestRunLog.created_at))),
+    ]
+    candidates = [value for value in candidates if value is not None]
+    return min(candidates).date() if candidates else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="first", type=date.fromisoformat)
+    parser.add_argument("--to", dest="last", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    with SessionLocal() as db:
+        first = args.first or _first_day(db)
+        last = min(args.last or yesterday, yesterday)
+        if first is None:
+            print("no data, nothing to backfill")
+            return
+        day = first
+        while day <= last:
+            rebuild_day(db, day, seal=True)
+            db.commit()
+            print(f"{day.isoformat()} sealed")
+            day += timedelta(days=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Recompute ``test_funnel_counters`` from ``test_events``.
+
+    python -m api.scripts.rebuild_funnel_counters [--test-id UUID]
+
+Needed after running with ``FUNNEL_COUNTERS_ENABLED=false`` for a while.
+"""
+
+from __future__ import annotations
+
+import argparse
+import uuid
+
+from api.app.db.session import SessionLocal
+from api.app.services.funnel import rebuild_counters
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--test-id", type=uuid.UUID)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        rebuild_counters(db, args.test_id)
+        db.commit()
+    print("funnel counters rebuilt" + (f" for {args.test_id}" if args.test_id else ""))
+
+
+if __name__ == "__main__":
+    main()
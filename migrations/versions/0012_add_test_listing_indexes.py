@@ -0,0 +1,30 @@
+"""add keyset indexes for test listings"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0012_add_test_listing_indexes"
+down_revision: Union[str, None] = "0011_update_admin_password"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_tests_created_at_id", "tests", ["created_at", "id"])
+    op.create_index("ix_tests_created_by_created_at_id", "tests", ["created_by", "created_at", "id"])
+    op.create_index(
+        "ix_tests_public_created_at_id",
+        "tests",
+        ["created_at", "id"],
+        postgresql_where=sa.text("is_public"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tests_public_created_at_id", table_name="tests")
+    op.drop_index("ix_tests_created_by_created_at_id", table_name="tests")
+    op.drop_index("ix_tests_created_at_id", table_name="tests")
@@ -0,0 +1,26 @@
+"""add prefix-search index on test slug"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0013_add_test_slug_pattern_index"
+down_revision: Union[str, None] = "0012_add_test_listing_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the unique btree on slug can't serve LIKE 'base-%' under a non-C collation
+    op.create_index(
+        "ix_tests_slug_pattern",
+        "tests",
+        ["slug"],
+        postgresql_ops={"slug": "varchar_pattern_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tests_slug_pattern", table_name="tests")
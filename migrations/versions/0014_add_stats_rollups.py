@@ -0,0 +1,39 @@
+"""add daily stats rollup tables"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0014_add_stats_rollups"
+down_revision: Union[str, None] = "0013_add_test_slug_pattern_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stats_daily",
+        sa.Column("day", sa.Date(), primary_key=True, nullable=False),
+        sa.Column("tests_created", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("tests_opened", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("tests_completed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sealed", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_table(
+        "stats_daily_users",
+        sa.Column("day", sa.Date(), primary_key=True, nullable=False),
+        sa.Column("kind", sa.String(length=16), primary_key=True, nullable=False),
+        sa.Column("user_id", sa.BigInteger(), primary_key=True, nullable=False),
+    )
+    # rebuilding a day scans raw logs by time range (tests use ix_tests_created_at_id)
+    op.create_index("ix_test_run_logs_created_at", "test_run_logs", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_test_run_logs_created_at", table_name="test_run_logs")
+    op.drop_table("stats_daily_users")
+    op.drop_table("stats_daily")
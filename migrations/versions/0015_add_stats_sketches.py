@@ -0,0 +1,29 @@
+"""add per-day distinct-user sketches"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0015_add_stats_sketches"
+down_revision: Union[str, None] = "0014_add_stats_rollups"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stats_daily_sketches",
+        sa.Column("day", sa.Date(), primary_key=True, nullable=False),
+        sa.Column("kind", sa.String(length=16), primary_key=True, nullable=False),
+        sa.Column("registers", sa.LargeBinary(), nullable=False),
+    )
+    # sketches are built in Python: unseal so /stats rebuilds recent days,
+    # older days get theirs from `python -m api.scripts.backfill_stats`
+    op.execute("UPDATE stats_daily SET sealed = false")
+
+
+def downgrade() -> None:
+    op.drop_table("stats_daily_sketches")
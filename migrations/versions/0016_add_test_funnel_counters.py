@@ -0,0 +1,49 @@
+"""add funnel index and per-test funnel counters"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0016_add_test_funnel_counters"
+down_revision: Union[str, None] = "0015_add_stats_sketches"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_test_events_test_event_question",
+        "test_events",
+        ["test_id", "event_type", "question_index"],
+    )
+    op.create_table(
+        "test_funnel_counters",
+        sa.Column(
+            "test_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("tests.id", ondelete="CASCADE"),
+            primary_key=True,
+            nullable=False,
+        ),
+        sa.Column("event_type", sa.String(length=32), primary_key=True, nullable=False),
+        sa.Column("question_index", sa.Integer(), primary_key=True, nullable=False, server_default="0"),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        """
+        INSERT INTO test_funnel_counters (test_id, event_type, question_index, count)
+        SELECT test_id, event_type, COALESCE(question_index, 0), COUNT(*)
+        FROM test_events
+        WHERE test_id IS NOT NULL
+        GROUP BY test_id, event_type, COALESCE(question_index, 0)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("test_funnel_counters")
+    op.drop_index("ix_test_events_test_event_question", table_name="test_events")
@@ -0,0 +1,63 @@
+"""add denormalized activity columns to tests"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0017_add_test_activity"
+down_revision: Union[str, None] = "0016_add_test_funnel_counters"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_SOURCES = (
+    ("run_log_count", "test_run_logs"),
+    ("event_count", "test_events"),
+    ("response_count", "test_responses"),
+)
+
+
+def upgrade() -> None:
+    op.add_column("tests", sa.Column("last_activity_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("tests", sa.Column("run_log_count", sa.BigInteger(), nullable=False, server_default="0"))
+    op.add_column("tests", sa.Column("event_count", sa.BigInteger(), nullable=False, server_default="0"))
+    op.add_column("tests", sa.Column("response_count", sa.BigInteger(), nullable=False, server_default="0"))
+
+    for column, table in _SOURCES:
+        op.execute(
+            f"""
+            UPDATE tests
+            SET {column} = s.n, last_activity_at = GREATEST(tests.last_activity_at, s.last_at)
+            FROM (
+                SELECT test_id, COUNT(*) AS n, MAX(created_at) AS last_at
+                FROM {table}
+                WHERE test_id IS NOT NULL
+                GROUP BY test_id
+            ) AS s
+            WHERE s.test_id = tests.id
+            """
+        )
+
+    op.create_index(
+        "ix_tests_active_last_activity_id",
+        "tests",
+        ["last_activity_at", "id"],
+        postgresql_where=sa.text("last_activity_at IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_tests_active_created_at_id",
+        "tests",
+        ["created_at", "id"],
+        postgresql_where=sa.text("last_activity_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tests_active_created_at_id", table_name="tests")
+    op.drop_index("ix_tests_active_last_activity_id", table_name="tests")
+    op.drop_column("tests", "response_count")
+    op.drop_column("tests", "event_count")
+    op.drop_column("tests", "run_log_count")
+    op.drop_column("tests", "last_activity_at")
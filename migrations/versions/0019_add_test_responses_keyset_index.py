@@ -0,0 +1,20 @@
+"""add keyset index for admin response pages"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0019_add_test_responses_keyset_index"
+down_revision: Union[str, None] = "0018_add_export_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_test_responses_test_created_at_id", "test_responses", ["test_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_test_responses_test_created_at_id", table_name="test_responses")
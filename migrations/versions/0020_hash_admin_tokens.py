@@ -0,0 +1,25 @@
+"""store admin tokens as sha256 hashes"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0020_hash_admin_tokens"
+down_revision: Union[str, None] = "0019_add_test_responses_keyset_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("DELETE FROM admin_tokens WHERE expires_at < now()")
+    # existing sessions keep working: the stored value becomes the hash of the token clients hold
+    op.execute("UPDATE admin_tokens SET token = encode(sha256(convert_to(token, 'UTF8')), 'hex')")
+    op.alter_column("admin_tokens", "token", new_column_name="token_hash")
+
+
+def downgrade() -> None:
+    # hashes cannot be turned back into tokens; admins log in again
+    op.execute("DELETE FROM admin_tokens")
+    op.alter_column("admin_tokens", "token_hash", new_column_name="token")
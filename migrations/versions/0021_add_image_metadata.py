@@ -0,0 +1,31 @@
+"""add image dimensions, dominant colour and placeholder"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0021_add_image_metadata"
+down_revision: Union[str, None] = "0020_hash_admin_tokens"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TABLES = ("questions", "results", "answers")
+
+
+def upgrade() -> None:
+    for table in _TABLES:
+        op.add_column(table, sa.Column("image_width", sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column("image_height", sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column("image_color", sa.String(length=7), nullable=True))
+        op.add_column(table, sa.Column("image_placeholder", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in _TABLES:
+        op.drop_column(table, "image_placeholder")
+        op.drop_column(table, "image_color")
+        op.drop_column(table, "image_height")
+        op.drop_column(table, "image_width")
@@ -0,0 +1,37 @@
+"""add content-addressed media objects"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0022_add_media_objects"
+down_revision: Union[str, None] = "0021_add_image_metadata"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_objects",
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("params", sa.String(length=255), nullable=False),
+        sa.Column("key", sa.Text(), nullable=False),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("content_type", sa.String(length=255), nullable=True),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column("color", sa.String(length=7), nullable=True),
+        sa.Column("placeholder", sa.Text(), nullable=True),
+        sa.Column("variants", postgresql.JSONB(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("content_hash", "params"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("media_objects")
@@ -0,0 +1,25 @@
+"""track when a response last changed, for export fingerprints"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0023_add_test_responses_updated_at"
+down_revision: Union[str, None] = "0022_add_media_objects"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("test_responses", sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE test_responses SET updated_at = created_at")
+    op.alter_column("test_responses", "updated_at", nullable=False, server_default=sa.func.now())
+    op.create_index("ix_test_responses_test_updated_at", "test_responses", ["test_id", "updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_test_responses_test_updated_at", table_name="test_responses")
+    op.drop_column("test_responses", "updated_at")
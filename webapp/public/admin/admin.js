@@ -20,6 +20,11 @@
   const reportDate = document.getElementById("reportDate");
   const funnelBox = document.getElementById("funnelBox");
   const responsesTable = document.getElementById("responsesTable");
+  const responsesResult = document.getElementById("responsesResult");
+  const responsesLead = document.getElementById("responsesLead");
+  const responsesLeadOnly = document.getElementById("responsesLeadOnly");
+  const responsesSort = document.getElementById("responsesSort");
+  const responsesMore = document.getElementById("responsesMore");
   const downloadBtn = document.getElementById("downloadBtn");
   const qaList = document.getElementById("qaList");
   const resultsList = document.getElementById("resultsList");
@@ -28,7 +33,11 @@
   const panels = Array.from(document.querySelectorAll(".tab-panel"));
 
   let tests = [];
+  let nextCursor = null;
   let activeTestId = null;
+  let activeReport = null;
+  let responses = [];
+  let responsesCursor = null;
 
   const setToken = (token) => {
     if (token) localStorage.setItem(tokenKey, token);
@@ -51,7 +60,7 @@
     if (testsError) testsError.textContent = "";
     const needle = (filter || "").toLowerCase();
     const filtered = tests.filter((t) => String(t.title || "").toLowerCase().includes(needle));
-    if (!filtered.length) {
+    if (!filtered.length && !nextCursor) {
       if (testsError) testsError.textContent = "Тесты не найдены";
       return;
     }
@@ -64,6 +73,13 @@
       item.addEventListener("click", () => selectTest(t.id));
       testsList.appendChild(item);
     });
+    if (nextCursor) {
+      const more = document.createElement("button");
+      more.className = "link";
+      more.textContent = "Показать ещё";
+      more.addEventListener("click", () => loadTests(true));
+      testsList.appendChild(more);
+    }
   };
 
   const renderFunnel = (funnel, test) => {
@@ -106,7 +122,7 @@
 
   const renderResponses = (report) => {
     if (!responsesTable) return;
-    const { questions, responses, test } = report;
+    const { questions, test } = report;
     const headers = ["telegram_id", "user"];
     questions.forEach((q, idx) => headers.push(`Вопрос ${idx + 1}`));
     if (test.lead_enabled) {
@@ -143,6 +159,35 @@
       return `<tr>${cols.map((c) => `<td>${String(c)}</td>`).join("")}</tr>`;
     });
     responsesTable.innerHTML = thead + `<tbody>${rows.join("")}</tbody>`;
+    if (responsesMore) responsesMore.hidden = !responsesCursor;
+  };
+
+  const loadResponses = async (append = false) => {
+    if (!activeReport) return;
+    const testId = activeReport.test.id;
+    const params = new URLSearchParams({ sort: responsesSort.value || "newest" });
+    if (responsesResult.value) params.set("result_title", responsesResult.value);
+    if (responsesLead.value.trim()) params.set("lead", responsesLead.value.trim());
+    if (responsesLeadOnly.checked) params.set("lead_form_submitted", "true");
+    if (append && responsesCursor) params.set("cursor", responsesCursor);
+    const res = await fetch(`${API_BASE}/admin/tests/${testId}/responses?${params}`, {
+      headers: { "X-Admin-Token": getToken() },
+    });
+    if (!res.ok || testId !== activeTestId) return;
+    const page = await res.json();
+    responses = append ? responses.concat(page) : page;
+    responsesCursor = res.headers.get("X-Next-Cursor");
+    renderResponses(activeReport);
+  };
+
+  const renderResultFilter = (report) => {
+    responsesResult.innerHTML = `<option value="">Все результаты</option>`;
+    report.results.forEach((r) => {
+      const option = document.createElement("option");
+      option.value = r.title;
+      option.textContent = r.title;
+      responsesResult.appendChild(option);
+    });
   };
 
   const renderQa = (report) => {
@@ -186,16 +231,10 @@
   const renderDistribution = (report) => {
     if (!distributionList) return;
     distributionList.innerHTML = "";
-    const responses = report.responses || [];
+    const distribution = report.distribution || {};
     report.questions.forEach((q, idx) => {
-      const counts = {};
-      let total = 0;
-      responses.forEach((r) => {
-        const answer = r.answers?.[String(q.id)];
-        if (!answer) return;
-        total += 1;
-        counts[answer] = (counts[answer] || 0) + 1;
-      });
+      const counts = distribution[String(q.id)] || {};
+      const total = Object.values(counts).reduce((sum, n) => sum + n, 0);
       const answers = (q.answers || []).map((a) => a.text).filter(Boolean);
       const rows = answers.length
         ? answers.map((answer) => {
@@ -231,23 +270,41 @@
       const shortDate = raw ? String(raw).split("T")[0] : "";
       reportDate.textContent = shortDate ? `Создан: ${shortDate}` : "";
     }
+    activeReport = report;
+    responses = [];
+    responsesCursor = null;
+    responsesLead.value = "";
+    responsesLeadOnly.checked = false;
     renderFunnel(report.funnel, report.test);
+    renderResultFilter(report);
     renderResponses(report);
+    loadResponses();
     renderQa(report);
     renderResults(report);
     renderDistribution(report);
   };
 
-  const loadTests = async () => {
+  const loadTests = async (append = false) => {
     if (testsError) testsError.textContent = "";
+    const params = new URLSearchParams({ sort: "recent" });
+    if (append && nextCursor) params.set("cursor", nextCursor);
     try {
-      const data = await fetchJson(`${API_BASE}/admin/tests`, {
+      const res = await fetch(`${API_BASE}/admin/tests?${params}`, {
         headers: { "X-Admin-Token": getToken() },
       });
-      tests = Array.isArray(data) ? data : [];
-      renderTests();
+      if (!res.ok) {
+        let msg = "Ошибка";
+        try { msg = (await res.json()).detail || msg; } catch {}
+        throw new Error(msg);
+      }
+      const data = await res.json();
+      const page = Array.isArray(data) ? data : [];
+      tests = append ? tests.concat(page) : page;
+      nextCursor = res.headers.get("X-Next-Cursor");
+      renderTests(searchInput.value || "");
     } catch (err) {
-      tests = [];
+      if (!append) tests = [];
+      nextCursor = null;
       if (testsError) testsError.textContent = err.message || "Не удалось загрузить тесты";
     }
   };
@@ -287,6 +344,16 @@
     renderTests(e.target.value || "");
   });
 
+  let leadSearchTimer = null;
+  responsesResult.addEventListener("change", () => loadResponses());
+  responsesSort.addEventListener("change", () => loadResponses());
+  responsesLeadOnly.addEventListener("change", () => loadResponses());
+  responsesLead.addEventListener("input", () => {
+    clearTimeout(leadSearchTimer);
+    leadSearchTimer = setTimeout(() => loadResponses(), 300);
+  });
+  responsesMore.addEventListener("click", () => loadResponses(true));
+
   tabs.forEach((tab) => {
     tab.addEventListener("click", () => {
       const name = tab.getAttribute("data-tab");
@@ -298,21 +365,31 @@
     });
   });
 
+  const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
   downloadBtn.addEventListener("click", async () => {
     if (!activeTestId) return;
-    const res = await fetch(`${API_BASE}/admin/tests/${activeTestId}/export`, {
-      headers: { "X-Admin-Token": getToken() },
-    });
-    if (!res.ok) return;
-    const blob = await res.blob();
-    const url = window.URL.createObjectURL(blob);
-    const link = document.createElement("a");
-    link.href = url;
-    link.download = `test-${activeTestId}.xlsx`;
-    document.body.appendChild(link);
-    link.click();
-    link.remove();
-    window.URL.revokeObjectURL(url);
+    const headers = { "X-Admin-Token": getToken() };
+    const label = downloadBtn.textContent;
+    downloadBtn.disabled = true;
+    downloadBtn.textContent = "Готовим файл…";
+    try {
+      let job = await fetchJson(`${API_BASE}/admin/tests/${activeTestId}/exports?format=xlsx`, {
+        method: "POST",
+        headers,
+      });
+      while (job.status === "queued" || job.status === "running") {
+        await sleep(2000);
+        job = await fetchJson(`${API_BASE}/admin/exports/${job.id}`, { headers });
+      }
+      if (job.status !== "done" || !job.download_url) throw new Error(job.error || "Не удалось выгрузить");
+      window.location.href = job.download_url;
+    } catch (err) {
+      alert(err.message || "Не удалось выгрузить");
+    } finally {
+      downloadBtn.disabled = false;
+      downloadBtn.textContent = label;
+    }
   });
 
   const init = async () => {
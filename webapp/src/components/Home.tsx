@@ -186,18 +186,26 @@ export function Home({ onCreate }: HomeProps) {
     log("Home.tsx initData length:", (WebApp.initData || "").length, "userId:", WebApp.initDataUnsafe?.user?.id);
 
     const tryEndpoints = async (): Promise<any[]> => {
-      const url = "/tests/mine?limit=200";
       const headers = { headers: { "X-Telegram-Init-Data": WebApp.initData ?? "" } };
-      try {
-        const res = await api.get(url, headers);
-        log("fetch", url, "status=", res.status, "ctype=", String(res?.headers?.["content-type"] || "").toLowerCase(), "len=", (Array.isArray(res?.data) ? res.data.length : Object.keys(res?.data || {}).length));
-        const data = res?.data as any;
-        const arr = Array.isArray(data) ? data : Array.isArray((data as any)?.items) ? (data as any).items : Array.isArray((data as any)?.results) ? (data as any).results : [];
-        return Array.isArray(arr) ? arr : [];
-      } catch (e: any) {
-        warn("fetch fail", url, e?.response?.status || e?.message);
-        throw e;
-      }
+      const all: any[] = [];
+      // The list is paginated: keep following X-Next-Cursor until the last page
+      let cursor: string | null = null;
+      do {
+        const url: string = "/tests/mine?limit=200&view=summary" + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : "");
+        try {
+          const res = await api.get(url, headers);
+          log("fetch", url, "status=", res.status, "ctype=", String(res?.headers?.["content-type"] || "").toLowerCase(), "len=", (Array.isArray(res?.data) ? res.data.length : Object.keys(res?.data || {}).length));
+          const data = res?.data as any;
+          const arr = Array.isArray(data) ? data : Array.isArray((data as any)?.items) ? (data as any).items : Array.isArray((data as any)?.results) ? (data as any).results : [];
+          if (Array.isArray(arr)) all.push(...arr);
+          const next = res?.headers?.["x-next-cursor"];
+          cursor = next && next !== cursor ? String(next) : null;
+        } catch (e: any) {
+          warn("fetch fail", url, e?.response?.status || e?.message);
+          throw e;
+        }
+      } while (cursor);
+      return all;
     };
 
     try {
@@ -13,15 +13,20 @@ import backCard from "../../cardunit.png";
 import type { AxiosInstance } from "axios";
 import WebApp from "@twa-dev/sdk";
 import LeadCapture from "./LeadCapture";
+import { imageProps, type ImageMeta } from "../../utils/image";
 
-type Answer = {
+// rendered widths of card images (testpage.css: .tp-card-img, .tp-image-frame)
+const CARD_GRID_SIZES = "(max-width: 420px) 120px, (max-width: 520px) 135px, 160px";
+const CARD_FRAME_SIZES = "(max-width: 320px) 65vw, 208px";
+
+type Answer = ImageMeta & {
   id: string;
   order_num: number;
   text: string;
   explanation_title?: string | null;
   explanation_text?: string | null;
 };
-type Question = {
+type Question = ImageMeta & {
   id: string;
   order_num: number;
   text: string;
@@ -36,7 +41,7 @@ type TestRead = {
   description?: string | null;
   questions: Question[];
   answers: Answer[];
-  results?: Array<{ id: string; order_num?: number | null; title: string; description?: string | null; image_url?: string | null; min_score?: number | null; max_score?: number | null }>;
+  results?: Array<ImageMeta & { id: string; order_num?: number | null; title: string; description?: string | null; image_url?: string | null; min_score?: number | null; max_score?: number | null }>;
   bg_color?: string | null;
   lead_enabled?: boolean;
   lead_collect_name?: boolean;
@@ -46,6 +51,10 @@ type TestRead = {
   lead_site_url?: string | null;
 };
 
+type QueuedEvent = { event_type: string; question_index: number | null; client_ts: string };
+const EVENT_BATCH_SIZE = 25;
+const EVENT_FLUSH_MS = 15000;
+
 export default function TestPage({ api, slug }: { api: AxiosInstance; slug: string }) {
   // Toggle blue background on <html> and <body> while тестовая страница активна
   useEffect(() => {
@@ -68,6 +77,8 @@ export default function TestPage({ api, slug }: { api: AxiosInstance; slug: stri
   const [picked, setPicked] = useState<string | null>(null);
   const logStateRef = useRef<"idle" | "pending" | "done">("idle");
   const eventStateRef = useRef<"idle" | "done">("idle");
+  const eventQueueRef = useRef<QueuedEvent[]>([]);
+  const eventTimerRef = useRef<number | null>(null);
   useEffect(() => {
     const raw = test?.bg_color || "3E8BBF";
     const clean = String(raw).replace(/^#/, "");
@@ -116,17 +127,42 @@ export default function TestPage({ api, slug }: { api: AxiosInstance; slug: stri
     return () => { mounted = false; };
   }, [api, slug]);
 
-  const logEvent = useCallback((eventType: string, questionIndex?: number) => {
-    if (!slug) return;
+  // События копим и отправляем пачкой в /events/batch: по размеру, таймеру, уходу со страницы или завершению
+  const flushEvents = useCallback(() => {
+    if (eventTimerRef.current !== null) {
+      window.clearTimeout(eventTimerRef.current);
+      eventTimerRef.current = null;
+    }
+    const events = eventQueueRef.current.splice(0, eventQueueRef.current.length);
+    if (!slug || events.length === 0) return;
     api.post(
-      `/tests/slug/${encodeURIComponent(slug)}/events`,
-      { event_type: eventType, question_index: questionIndex ?? null },
+      `/tests/slug/${encodeURIComponent(slug)}/events/batch`,
+      { events },
       { headers: { "X-Telegram-Init-Data": WebApp.initData ?? "" } }
     ).catch((err: any) => {
-      warn("logEvent fail", eventType, err?.response?.status || err?.message);
+      warn("logEvent batch fail", events.length, err?.response?.status || err?.message);
     });
   }, [api, slug]);
 
+  const logEvent = useCallback((eventType: string, questionIndex?: number) => {
+    if (!slug) return;
+    eventQueueRef.current.push({ event_type: eventType, question_index: questionIndex ?? null, client_ts: new Date().toISOString() });
+    if (eventQueueRef.current.length >= EVENT_BATCH_SIZE || eventType === "lead_form_submit" || eventType === "site_click") {
+      flushEvents();
+      return;
+    }
+    if (eventTimerRef.current === null) eventTimerRef.current = window.setTimeout(flushEvents, EVENT_FLUSH_MS);
+  }, [slug, flushEvents]);
+
+  useEffect(() => {
+    const onVisibility = () => { if (document.visibilityState === "hidden") flushEvents(); };
+    document.addEventListener("visibilitychange", onVisibility);
+    return () => {
+      document.removeEventListener("visibilitychange", onVisibility);
+      flushEvents();
+    };
+  }, [flushEvents]);
+
   useEffect(() => {
     if (!test || eventStateRef.current === "done") return;
     eventStateRef.current = "done";
@@ -135,6 +171,7 @@ export default function TestPage({ api, slug }: { api: AxiosInstance; slug: stri
 
   const logCompletion = useCallback(() => {
     if (!slug) return;
+    flushEvents();
     if (logStateRef.current === "pending" || logStateRef.current === "done") return;
     logStateRef.current = "pending";
     api.post(
@@ -147,7 +184,7 @@ export default function TestPage({ api, slug }: { api: AxiosInstance; slug: stri
         logStateRef.current = "idle";
         warn("logCompletion fail", err?.response?.status || err?.message);
       });
-  }, [api, slug]);
+  }, [api, slug, flushEvents]);
 
   const createResponse = useCallback(async (answers: any[], resultTitle?: string | null) => {
     if (!slug) return null;
@@ -179,7 +216,7 @@ export default function TestPage({ api, slug }: { api: AxiosInstance; slug: stri
           <div className="tp-panel">
           <div className="tp-panel__content tp-panel__content--tight">
             <div className="tp-step">{`Вопрос 1/1`}</div>
-            {q.image_url && <img className="tp-question-image" src={q.image_url} alt="question" />}
+            {q.image_url && <img className="tp-question-image" src={q.image_url} alt="question" {...imageProps(q, { eager: true })} />}
             <h3 className="tp-question-title">{q.text}</h3>
               <div className="tp-options">
                 {q.answers.map((a) => (
@@ -321,6 +358,7 @@ function CardsRunner({
                   <img
                     src={mode === 'open' ? (a.image_url || (a as any).imageUrl || backCard) : backCard}
                     alt="card"
+                    {...imageProps(mode === 'open' && a.image_url ? a : null, { fill: true, sizes: CARD_GRID_SIZES })}
                   />
                 </button>
               ))}
@@ -344,6 +382,7 @@ function CardsRunner({
                   className="tp-image-big"
                   src={current.image_url || (current as any).imageUrl || backCard}
                   alt={current.text || "card"}
+                  {...imageProps(current.image_url ? current : null, { eager: true, fill: true, sizes: CARD_FRAME_SIZES })}
                 />
               </div>
               <div className="tp-result-box">
@@ -393,7 +432,7 @@ function MultiRunner({
     return anyRange;
   }, [test]);
 
-  const computeResult = (): { title: string; description?: string; imageUrl?: string | null } | null => {
+  const computeResult = (): { title: string; description?: string; imageUrl?: string | null; imageMeta?: ImageMeta } | null => {
     try {
       if (!questions.length) return { title: "Результат", description: undefined };
       const picks = questions.map((q) => {
@@ -412,9 +451,9 @@ function MultiRunner({
           if (min === null || max === null) return false;
           return total >= min && total <= max;
         });
-        if (ranged) return { title: ranged.title, description: ranged.description || undefined, imageUrl: ranged.image_url };
+        if (ranged) return { title: ranged.title, description: ranged.description || undefined, imageUrl: ranged.image_url, imageMeta: ranged };
         const fallback = results[0] || results[results.length - 1];
-        return fallback ? { title: fallback.title, description: fallback.description || undefined, imageUrl: fallback.image_url } : { title: "Результат", description: undefined };
+        return fallback ? { title: fallback.title, description: fallback.description || undefined, imageUrl: fallback.image_url, imageMeta: fallback } : { title: "Результат", description: undefined };
       } else {
         const counts: Record<number, number> = {};
         picks.forEach(p => { counts[p.order] = (counts[p.order] || 0) + 1; });
@@ -426,7 +465,7 @@ function MultiRunner({
         });
         const idx = Math.max(0, Math.min((results.length || answersCount) - 1, bestOrder - 1));
         const res = results[idx];
-        if (res) return { title: res.title, description: res.description || undefined, imageUrl: res.image_url };
+        if (res) return { title: res.title, description: res.description || undefined, imageUrl: res.image_url, imageMeta: res };
         const a = questions[0]?.answers?.[bestOrder - 1];
         if (a?.explanation_title || a?.explanation_text) {
           return { title: a.explanation_title || "Результат", description: a.explanation_text || undefined };
@@ -474,7 +513,14 @@ function MultiRunner({
         <div className="tp-panel">
           <div className="tp-panel__content">
             <div className="tp-step">{`Вопрос ${index + 1}/${questions.length}`}</div>
-            {current.image_url && <img className="tp-question-image" src={current.image_url} alt="question" />}
+            {current.image_url && (
+              <img
+                className="tp-question-image"
+                src={current.image_url}
+                alt="question"
+                {...imageProps(current, { eager: index === 0 })}
+              />
+            )}
             <h3 className="tp-question-title">{current.text}</h3>
             <div className="tp-options">
               {answersList.map((a) => (
@@ -512,7 +558,7 @@ function MultiRunner({
         <div className="tp-panel__content tp-result">
           {result ? (
             <>
-              {result.imageUrl && <img className="tp-result-image" src={result.imageUrl} alt="result" />}
+              {result.imageUrl && <img className="tp-result-image" src={result.imageUrl} alt="result" {...imageProps(result.imageMeta)} />}
               <div className="tp-result-title">{result.title}</div>
               <div className="tp-result-box"><p style={{ margin: 0 }}>{result.description || ""}</p></div>
               <LeadCapture
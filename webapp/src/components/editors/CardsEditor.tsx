@@ -3,7 +3,7 @@ import type { AxiosInstance } from "axios";
 import WebApp from "@twa-dev/sdk";
 
 import { AnswerDraft, ResultDraft, TestDraft } from "../../types";
-import { compressImage } from "../../utils/image";
+import { compressImage, imageMetaFromUpload, type ImageMeta } from "../../utils/image";
 import type { TestRead } from "../../types/tests";
 import { LeadSettings, LeadSettingsValue } from "./LeadSettings";
 
@@ -308,7 +308,7 @@ function CardsList({ draft, onChange, onDebug }: { draft: TestDraft; onChange: <
               initialUrl={(answer as any).imageUrl}
               previewUrl={(answer as any).localPreview}
               onPreview={(local) => updateAnswer(idx, { ...answer, localPreview: local } as any)}
-              onUploaded={(url) => updateAnswer(idx, { ...answer, imageUrl: url, localPreview: url } as any)}
+              onUploaded={(url, meta) => updateAnswer(idx, { ...answer, imageUrl: url, imageMeta: meta, localPreview: url } as any)}
               onDebug={onDebug}
             />
             <div className="card-editor__fields">
@@ -345,7 +345,7 @@ function ImageUploader({
   initialUrl?: string;
   previewUrl?: string;
   onPreview: (url: string) => void;
-  onUploaded: (url: string) => void;
+  onUploaded: (url: string, meta?: ImageMeta) => void;
   onDebug?: (info: any) => void;
 }) {
   const [busy, setBusy] = useState(false);
@@ -359,10 +359,10 @@ function ImageUploader({
       const processed = await compressImage(file);
       const fd = new FormData();
       fd.append("file", processed);
-      fd.append("prefix", "cards");
       const initData = WebApp.initData || (window as any).Telegram?.WebApp?.initData || "";
       const apiBase = (import.meta as any).env?.VITE_API_BASE_URL;
-      const endpoint = String(apiBase + "/media/upload");
+      // compresses to the card format and returns responsive variants
+      const endpoint = String(apiBase + "/cards/upload-image");
 
       const res = await fetch(endpoint, {
         method: "POST",
@@ -389,7 +389,7 @@ function ImageUploader({
         throw new Error("Сервер не вернул URL файла");
       }
       onDebug?.({ stage: "success", status: res.status, url, endpoint });
-      onUploaded(url);
+      onUploaded(url, imageMetaFromUpload(data));
     } catch (error: any) {
       onPreview(initialUrl || "");
       WebApp.showPopup?.({ title: "Загрузка", message: error?.message || "Не удалось загрузить", buttons: [{ type: "ok" }] });
@@ -460,6 +460,7 @@ function toApiPayload(draft: TestDraft, mode: "open" | "closed", opts?: { includ
       explanation_title: (a as any).explanationTitle,
       explanation_text: (a as any).explanationText,
       image_url: (a as any).imageUrl,
+      ...((a as any).imageMeta || {}),
       result_id: (a as any).resultId,
     })),
     results: draft.results.map((r) => ({ title: r.title, description: r.description, min_score: r.minScore, max_score: r.maxScore })),
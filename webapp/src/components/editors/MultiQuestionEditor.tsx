@@ -1,7 +1,7 @@
 import { FormEvent, useEffect, useMemo, useState } from "react";
 import type { AxiosInstance } from "axios";
 import WebApp from "@twa-dev/sdk";
-import { compressImage } from "../../utils/image";
+import { compressImage, imageMetaFromUpload } from "../../utils/image";
 
 import { AnswerDraft, QuestionDraft, ResultDraft, TestDraft, ScoringMode } from "../../types";
 import type { TestRead } from "../../types/tests";
@@ -366,7 +366,7 @@ function QuestionList({ draft, onChange }: { draft: TestDraft; onChange: <K exte
         return;
       }
       const q = questions[index];
-      updateQuestion(index, { ...q, imageUrl: data.url });
+      updateQuestion(index, { ...q, imageUrl: data.url, imageMeta: imageMetaFromUpload(data) } as any);
     } catch {
       setUploadError("Ошибка загрузки изображения.");
     }
@@ -492,7 +492,7 @@ function ResultList({
         setImageError("Не удалось получить ссылку на изображение.");
         return;
       }
-      update(index, { ...results[index], imageUrl: data.url });
+      update(index, { ...results[index], imageUrl: data.url, imageMeta: imageMetaFromUpload(data) } as any);
     } catch {
       setImageError("Ошибка загрузки изображения.");
     }
@@ -575,6 +575,7 @@ function toApiPayload(draft: TestDraft, opts?: { includeSlug?: boolean }) {
       order_num: qi + 1,
       text: q.text,
       image_url: q.imageUrl,
+      ...((q as any).imageMeta || {}),
       answers: q.answers.map((a, ai) => ({
         order_num: ai + 1,
         text: a.text,
@@ -587,6 +588,7 @@ function toApiPayload(draft: TestDraft, opts?: { includeSlug?: boolean }) {
       title: r.title && r.title.trim() ? r.title : `Результат ${i + 1}`,
       description: r.description,
       image_url: (r as any).imageUrl,
+      ...((r as any).imageMeta || {}),
       min_score: (draft.scoringMode ?? "majority") === "points" ? r.minScore : null,
       max_score: (draft.scoringMode ?? "majority") === "points" ? r.maxScore : null,
     })),
@@ -1,7 +1,7 @@
 import { useEffect, useState } from "react";
 import type { AxiosInstance } from "axios";
 import WebApp from "@twa-dev/sdk";
-import { compressImage } from "../../utils/image";
+import { compressImage, imageMetaFromUpload, type ImageMeta } from "../../utils/image";
 import { LeadSettings, LeadSettingsValue } from "./LeadSettings";
 import type { TelegramUser } from "../../types/telegram";
 import type { TestRead } from "../../types/tests";
@@ -26,7 +26,7 @@ export default function SingleEditor({
 }) {
   const [title, setTitle] = useState<string>("");
   const [step, setStep] = useState<"title" | "question" | "lead" | "color">("title");
-  const [qa, setQa] = useState<{ question: string; answers: Answer[]; imageUrl?: string }>({ question: "", answers: [{ text: "" }, { text: "" }] });
+  const [qa, setQa] = useState<{ question: string; answers: Answer[]; imageUrl?: string; imageMeta?: ImageMeta }>({ question: "", answers: [{ text: "" }, { text: "" }] });
   const [imageError, setImageError] = useState<string | null>(null);
   const [bgColor, setBgColor] = useState<string>(BG_COLORS[0]);
   const [leadSettings, setLeadSettings] = useState<LeadSettingsValue>({
@@ -94,7 +94,7 @@ export default function SingleEditor({
     };
   }, [api, editSlug]);
 
-  const save = async (data: { question: string; answers: Answer[]; imageUrl?: string }) => {
+  const save = async (data: { question: string; answers: Answer[]; imageUrl?: string; imageMeta?: ImageMeta }) => {
     const cleanQuestion = data.question.trim();
     const cleanAnswers = data.answers.map((a) => ({
       text: (a.text || "").trim(),
@@ -118,6 +118,7 @@ export default function SingleEditor({
           order_num: 1,
           text: cleanQuestion,
           image_url: data.imageUrl || null,
+          ...(data.imageMeta || {}),
           answers: data.answers.map((a, idx) => ({
             order_num: idx + 1,
             text: cleanAnswers[idx].text,
@@ -212,7 +213,7 @@ export default function SingleEditor({
       onChange={setBgColor}
       submitting={submitting}
       onBack={() => setStep(showLeadStep ? "lead" : "question")}
-      onSubmit={() => save({ question: qa.question, answers: qa.answers, imageUrl: qa.imageUrl })}
+      onSubmit={() => save({ question: qa.question, answers: qa.answers, imageUrl: qa.imageUrl, imageMeta: qa.imageMeta })}
       mode={isEdit ? "edit" : "create"}
     />
   );
@@ -243,8 +244,8 @@ function QuestionStep({
   submitting,
   error,
 }: {
-  value: { question: string; answers: Answer[]; imageUrl?: string };
-  onChange: (data: { question: string; answers: Answer[]; imageUrl?: string }) => void;
+  value: { question: string; answers: Answer[]; imageUrl?: string; imageMeta?: ImageMeta };
+  onChange: (data: { question: string; answers: Answer[]; imageUrl?: string; imageMeta?: ImageMeta }) => void;
   imageError: string | null;
   onImageError: (val: string | null) => void;
   onNext: () => void;
@@ -281,7 +282,7 @@ function QuestionStep({
         onImageError("Не удалось получить ссылку на изображение.");
         return;
       }
-      onChange({ ...value, imageUrl: data.url });
+      onChange({ ...value, imageUrl: data.url, imageMeta: imageMetaFromUpload(data) });
     } catch {
       onImageError("Ошибка загрузки изображения.");
     }
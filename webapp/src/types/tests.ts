@@ -1,6 +1,7 @@
 import { TestType } from "./index";
+import type { ImageMeta } from "../utils/image";
 
-export interface AnswerRead {
+export interface AnswerRead extends ImageMeta {
   id: string;
   order_num: number;
   text?: string | null;
@@ -10,7 +11,7 @@ export interface AnswerRead {
   result_id?: string | null;
 }
 
-export interface QuestionRead {
+export interface QuestionRead extends ImageMeta {
   id: string;
   order_num: number;
   text: string;
@@ -18,7 +19,7 @@ export interface QuestionRead {
   answers: AnswerRead[];
 }
 
-export interface ResultRead {
+export interface ResultRead extends ImageMeta {
   id: string;
   order_num?: number | null;
   title: string;
@@ -41,3 +41,75 @@ export async function compressImage(file: File, opts?: { maxSide?: number; quali
   if (!blob) return file;
   return new File([blob], file.name.replace(/\.[^/.]+$/, "") + ".jpg", { type: "image/jpeg" });
 }
+
+/** One responsive width of an image (`/cards/upload-image` produces them). */
+export type ImageVariant = { url: string; width: number; height?: number | null };
+
+/** Image metadata computed by the API on upload and stored next to `image_url`. */
+export type ImageMeta = {
+  image_width?: number | null;
+  image_height?: number | null;
+  image_color?: string | null;
+  image_placeholder?: string | null;
+  image_variants?: ImageVariant[] | null;
+};
+
+/** Metadata fields of a `/media/upload` (or `/cards/upload-image`) response, if the server could read the image. */
+export function imageMetaFromUpload(data: any): ImageMeta | undefined {
+  if (!data?.width || !data?.height) return undefined;
+  return {
+    image_width: data.width,
+    image_height: data.height,
+    image_color: data.color ?? null,
+    image_placeholder: data.placeholder ?? null,
+    image_variants: Array.isArray(data.variants)
+      ? data.variants.map((v: any) => ({ url: v.url, width: v.width, height: v.height ?? null }))
+      : null,
+  };
+}
+
+/**
+ * Props for an `<img>` that reserves its box and shows the dominant colour and
+ * blurred placeholder until the real image arrives.
+ *
+ * `eager`: the image is visible on first paint (e.g. the first question), so
+ * it is not lazy-loaded. `fill`: CSS sizes the image (it fills a card or a
+ * frame), so its height is left to the stylesheet. `sizes`: the rendered CSS
+ * width; with stored variants the browser then picks the smallest adequate one.
+ */
+export function imageProps(meta?: ImageMeta | null, opts?: { eager?: boolean; fill?: boolean; sizes?: string }) {
+  const props: {
+    width?: number;
+    height?: number;
+    srcSet?: string;
+    sizes?: string;
+    loading: "lazy" | "eager";
+    decoding: "async";
+    style?: Record<string, string>;
+    onLoad?: (e: { currentTarget: HTMLImageElement }) => void;
+  } = {
+    loading: opts?.eager ? "eager" : "lazy",
+    decoding: "async",
+  };
+  if (!meta) return props;
+  if (meta.image_width && meta.image_height) {
+    props.width = meta.image_width;
+    props.height = meta.image_height;
+  }
+  if (meta.image_variants?.length) {
+    props.srcSet = meta.image_variants.map((v) => `${v.url} ${v.width}w`).join(", ");
+    props.sizes = opts?.sizes || "100vw";
+  }
+  const background = [
+    meta.image_placeholder ? `url("${meta.image_placeholder}") center / cover no-repeat` : "",
+    meta.image_color || "",
+  ].filter(Boolean).join(", ");
+  if (background) {
+    props.style = opts?.fill ? { background } : { background, height: "auto" };
+    // drop the placeholder once loaded so it can't show through transparent pixels
+    props.onLoad = (e) => {
+      e.currentTarget.style.background = "";
+    };
+  }
+  return props;
+}